@@ -0,0 +1,85 @@
+"""Время записи результатов парсинга: по одной ссылке и пачками.
+
+Нужна локальная база Postgres, настройки берутся из .env (DB_HOST, POSTGRES_*).
+Бенчмарк создаёт временную группу и удаляет её после замера.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bulk_writes --links 5000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from decouple import config
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from bot.database.models.price_history import PriceHistory
+from bot.database.models.product_group import ProductGroup
+from bot.database.models.product_link import SNAPSHOT_FIELDS, ProductLink
+from bot.database.models.site import Site
+from bot.database.models.user import User
+from bot.tasks.writer import BatchWriter
+from core.configs.database import DbConfig, TORTOISE_ORM
+
+FIELDS = ("productName", "companyName", *SNAPSHOT_FIELDS)
+
+
+def update(link: ProductLink, price: float) -> PriceHistory:
+    link.productName = f"Товар {link.id}"
+    link.companyName = "ТОО Компания"
+    link.record_check(datetime.now(timezone.utc), price=price)
+    return PriceHistory(product_link=link, price=int(price), date=link.last_check)
+
+
+async def per_link(links: list[ProductLink]) -> float:
+    started = time.perf_counter()
+    async with in_transaction() as conn:
+        for link in links:
+            history = update(link, 100.0)
+            await link.save(using_db=conn)
+            await history.save(using_db=conn)
+    return time.perf_counter() - started
+
+
+async def batched(links: list[ProductLink], batch_size: int) -> float:
+    started = time.perf_counter()
+    async with BatchWriter(FIELDS, batch_size=batch_size) as writer:
+        for link in links:
+            await writer.add(link, update(link, 200.0))
+    return time.perf_counter() - started
+
+
+async def run(links_count: int, batch_size: int) -> None:
+    await Tortoise.init(
+        db_url=DbConfig.from_env(config).construct_tortoise_url(),
+        modules={"models": [m for m in TORTOISE_ORM["apps"]["models"]["models"] if m != "aerich.models"]},
+    )
+    site, _ = await Site.get_or_create(title="SATU KZ")
+    user, _ = await User.get_or_create(telegram_id=0, defaults={"name": "benchmark"})
+    group = await ProductGroup.create(title="benchmark", site=site, user=user)
+    try:
+        await ProductLink.bulk_create(
+            [ProductLink(group=group, url=f"https://satu.kz/p{i}") for i in range(links_count)]
+        )
+        links = await ProductLink.filter(group=group).order_by("id")
+
+        print(f"Ссылок: {links_count}")
+        print(f"save + create по одной: {await per_link(links):6.2f} s")
+        print(f"BatchWriter ({batch_size}):     {await batched(links, batch_size):6.2f} s")
+    finally:
+        await group.delete()
+        await Tortoise.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--links", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.links, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Параллельное формирование отчётов: каждый файл должен содержать только свои данные.
+
+Отчёты строятся в памяти, без общего временного файла. Скрипт запускает много
+отчётов одновременно — в пуле потоков напрямую через write_report и через
+TableHandler.create_excel_with_autofit (пул отчётов из REPORT_EXECUTOR) — и
+проверяет, что каждая книга содержит строки своего отчёта. При ошибке завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.concurrent_reports --reports 20 --rows 2000
+"""
+import argparse
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from openpyxl import load_workbook
+
+from bot.services.link import TableHandler
+from bot.tasks.reports import report_queue
+from bot.utils.excel import write_report
+
+
+def make_rows(report: int, rows: int) -> list[dict]:
+    """Строки отчёта с номером отчёта в каждой ячейке, чтобы чужие данные было видно сразу."""
+    return [{
+        "Название продукта": f"Отчёт {report} товар {i}",
+        "Название компании": f"Компания {report}",
+        "Ссылка на товар": f"https://satu.kz/r{report}/p{i}",
+    } for i in range(rows)]
+
+
+def check(report: int, rows: int, data: bytes) -> list[str]:
+    """Сверяет содержимое книги с ожидаемыми строками отчёта. Возвращает список расхождений."""
+    sheet = load_workbook(io.BytesIO(data), read_only=True).active
+    values = list(sheet.iter_rows(min_row=2, values_only=True))
+    expected = [tuple(row.values()) for row in make_rows(report, rows)]
+    if values == expected:
+        return []
+    foreign = {str(value).split()[1] for row in values for value in row[:1] if value}
+    return [f"отчёт {report}: строк {len(values)} (ожидалось {rows}), данные отчётов: {sorted(foreign)}"]
+
+
+async def run_write_report(reports: int, rows: int, workers: int) -> list[str]:
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outputs = await asyncio.gather(*(
+            loop.run_in_executor(executor, write_report, make_rows(report, rows))
+            for report in range(reports)
+        ))
+    return [error for report, output in enumerate(outputs) for error in check(report, rows, output.getvalue())]
+
+
+async def run_table_handler(reports: int, rows: int) -> list[str]:
+    groups = [SimpleNamespace(title=f"Группа {report}") for report in range(reports)]
+    try:
+        files = await asyncio.gather(*(
+            TableHandler.create_excel_with_autofit(make_rows(report, rows), groups[report])
+            for report in range(reports)
+        ))
+    finally:
+        await report_queue.close()
+
+    errors = []
+    for report, file in enumerate(files):
+        if file.filename != f"{groups[report].title}.xlsx":
+            errors.append(f"отчёт {report}: имя файла {file.filename}")
+        errors += check(report, rows, file.data)
+    return errors
+
+
+async def run(reports: int, rows: int, workers: int) -> int:
+    failed = False
+    for name, scenario in (
+            ("write_report", run_write_report(reports, rows, workers)),
+            ("create_excel_with_autofit", run_table_handler(reports, rows)),
+    ):
+        started = time.perf_counter()
+        errors = await scenario
+        elapsed = time.perf_counter() - started
+        print(f"{name:>26}: {reports} отчётов за {elapsed:6.2f} s, ошибок: {len(errors)}")
+        for error in errors:
+            print(f"    {error}")
+        failed = failed or bool(errors)
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.reports, args.rows, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
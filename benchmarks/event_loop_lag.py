@@ -0,0 +1,81 @@
+"""Задержка event loop при разборе страниц с пулом и без него.
+
+Запуск из корня репозитория:
+    python -m benchmarks.event_loop_lag --pages 200 --workers 2
+"""
+import argparse
+import asyncio
+import time
+
+from bot.tasks.extract import create_parse_executor, extract_product_from_bytes
+
+TICK = 0.01  # seconds
+
+
+def make_page(size_kb: int) -> bytes:
+    """Синтетическая страница товара с полями в конце документа."""
+    filler = "".join(
+        f"<div class='row'><span data-i='{i}'>Описание характеристики {i}</span></div>"
+        for i in range(size_kb * 12)
+    )
+    return (
+        f"<html><body>{filler}"
+        "<h1 data-qaid='product_name'>Противогаз ГП-7</h1>"
+        "<div class='l-GwW fvQVX'><a data-qaid='company_name'>ТОО Компания</a></div>"
+        "<div class='tqUsL'><div data-qaprice='12500'>12 500 ₸</div></div>"
+        "</body></html>"
+    ).encode()
+
+
+async def measure_lag(stop: asyncio.Event) -> list[float]:
+    """Фиксирует, насколько позже запланированного просыпается корутина."""
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+    return lags
+
+
+async def run(kind: str, pages: int, workers: int, page: bytes) -> None:
+    executor = create_parse_executor(kind, workers)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(measure_lag(stop))
+
+    started = time.perf_counter()
+    for _ in range(pages):
+        if executor is None:
+            extract_product_from_bytes(page)
+            await asyncio.sleep(0)
+        else:
+            await loop.run_in_executor(executor, extract_product_from_bytes, page)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    lags = sorted(await monitor)
+    if executor is not None:
+        executor.shutdown()
+
+    p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+    print(
+        f"{kind:>8}: {elapsed:6.2f} s, lag max {max(lags, default=0) * 1000:7.1f} ms, "
+        f"p99 {p99 * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    page = make_page(args.size_kb)
+    print(f"Страница: {len(page) / 1024:.0f} KB, страниц: {args.pages}")
+    for kind in ("none", "thread", "process"):
+        asyncio.run(run(kind, args.pages, args.workers, page))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from typing import Sequence
+
+from tortoise.indexes import Index
+
+
+class SortedIndex(Index):
+    """B-tree индекс с порядком сортировки полей.
+
+    Поля из desc входят в индекс по убыванию, как в "CREATE INDEX ... (a, b DESC)".
+    Tortoise Index не умеет задавать порядок: имена полей он только экранирует.
+    """
+
+    def __init__(self, *, fields: Sequence[str], desc: Sequence[str] = (), name: str):
+        super().__init__(fields=fields, name=name)
+        self.desc = tuple(desc)
+
+    def describe(self) -> dict:
+        return dict(super().describe(), desc=list(self.desc))
+
+    def get_sql(self, schema_generator, model, safe: bool) -> str:
+        columns = ", ".join(
+            schema_generator.quote(field) + (" DESC" if field in self.desc else "")
+            for field in self.fields
+        )
+        return schema_generator.INDEX_CREATE_TEMPLATE.format(
+            exists="IF NOT EXISTS " if safe else "",
+            index_name=self.name,
+            index_type="",
+            table_name=model._meta.db_table,
+            fields=columns,
+            extra="",
+        )
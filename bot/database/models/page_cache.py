@@ -0,0 +1,15 @@
+from tortoise import fields
+from tortoise.models import Model
+
+
+class PageCache(Model):
+    id = fields.IntField(pk = True)
+    url = fields.CharField(max_length = 500, unique = True)
+    etag = fields.CharField(max_length = 255, null = True)
+    last_modified = fields.CharField(max_length = 64, null = True)
+    data = fields.JSONField()
+    fetched_at = fields.DatetimeField()
+    used_at = fields.DatetimeField()
+
+    def __str__(self):
+        return self.url
@@ -1,12 +1,17 @@
 from tortoise import fields
 from tortoise.models import Model
 
+from bot.database.indexes import SortedIndex
+
 
 class PriceHistory(Model):
     id = fields.IntField(pk=True)
     price = fields.IntField(null=True)
     views = fields.IntField(null=True)
     date = fields.DatetimeField()
+    # Запись действует с date по valid_to: при неизменном значении новые проверки продлевают её
+    valid_to = fields.DatetimeField(null=True)
+    checks = fields.IntField(default=1)
 
     product_link: fields.ForeignKeyRelation["ProductLink"] = fields.ForeignKeyField(
         "models.ProductLink", related_name="price_history", on_delete=fields.CASCADE
@@ -14,3 +19,9 @@ class PriceHistory(Model):
 
     def __str__(self):
         return f"{self.price} в {self.date}"
+
+    class Meta:
+        # Отчёты читают последние записи истории ссылки: индекс (product_link_id, date DESC), как в миграциях
+        indexes = (
+            SortedIndex(fields = ("product_link_id", "date"), desc = ("date",), name = "idx_pricehistory_link_date"),
+        )
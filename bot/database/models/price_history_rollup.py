@@ -0,0 +1,26 @@
+from tortoise import fields
+from tortoise.models import Model
+
+
+class PriceHistoryRollup(Model):
+    """Сводка истории ссылки за день или неделю: минимум, максимум, последнее значение и число записей."""
+    id = fields.IntField(pk = True)
+    period = fields.CharField(max_length = 8)
+    period_start = fields.DatetimeField()
+    min_price = fields.IntField(null = True)
+    max_price = fields.IntField(null = True)
+    last_price = fields.IntField(null = True)
+    min_views = fields.IntField(null = True)
+    max_views = fields.IntField(null = True)
+    last_views = fields.IntField(null = True)
+    count = fields.IntField()
+
+    product_link: fields.ForeignKeyRelation["ProductLink"] = fields.ForeignKeyField(
+        "models.ProductLink", related_name = "rollups", on_delete = fields.CASCADE
+    )
+
+    def __str__(self):
+        return f"{self.period} {self.period_start}: {self.last_price or self.last_views}"
+
+    class Meta:
+        unique_together = ("product_link", "period", "period_start")
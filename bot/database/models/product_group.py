@@ -17,6 +17,8 @@ class ProductGroup(Model):
     )
     is_active = fields.BooleanField(default=False)
     last_check = fields.DatetimeField(null = True)
+    # Увеличивается при каждом изменении данных группы; по нему сбрасывается кэш отчётов
+    data_version = fields.IntField(default = 0)
 
     product_links: fields.ReverseRelation["ProductLink"]
 
@@ -1,6 +1,17 @@
+from datetime import datetime
+from typing import Optional
+
 from tortoise import fields
 from tortoise.models import Model
 
+# Поля ссылки, которые меняются при каждой проверке вместе с добавлением записи истории
+SNAPSHOT_FIELDS = (
+    "last_price", "last_views", "last_check",
+    "prev_price", "prev_views", "prev_check",
+    "first_price", "first_views", "first_check",
+    "last_change",
+)
+
 
 class ProductLink(Model):
     id = fields.IntField(pk = True)
@@ -9,6 +20,17 @@ class ProductLink(Model):
     url = fields.CharField(max_length = 500)
     last_price = fields.FloatField(null = True)
     last_check = fields.DatetimeField(null = True)
+    last_views = fields.IntField(null = True)
+
+    # Снимок истории: предыдущая и первая проверка, дата последнего изменения значения.
+    # Обновляется вместе с записью истории, чтобы отчёты не читали PriceHistory
+    prev_price = fields.FloatField(null = True)
+    prev_views = fields.IntField(null = True)
+    prev_check = fields.DatetimeField(null = True)
+    first_price = fields.FloatField(null = True)
+    first_views = fields.IntField(null = True)
+    first_check = fields.DatetimeField(null = True)
+    last_change = fields.DatetimeField(null = True)
 
     group: fields.ForeignKeyRelation["ProductGroup"] = fields.ForeignKeyField(
         "models.ProductGroup", related_name = "product_links", on_delete = fields.CASCADE
@@ -16,6 +38,27 @@ class ProductLink(Model):
 
     price_history: fields.ReverseRelation["PriceHistory"]
 
+    def record_check(self, checked_at: datetime, price: Optional[float] = None, views: Optional[int] = None) -> bool:
+        """Сдвигает последнюю проверку в предыдущую и записывает новую.
+
+        Возвращает True, если значение изменилось (или это первая проверка).
+        """
+        if self.last_check is not None:
+            self.prev_price = self.last_price
+            self.prev_views = self.last_views
+            self.prev_check = self.last_check
+        if self.first_check is None:
+            self.first_price = price
+            self.first_views = views
+            self.first_check = checked_at
+        changed = self.last_check is None or (price, views) != (self.last_price, self.last_views)
+        if changed:
+            self.last_change = checked_at
+        self.last_price = price
+        self.last_views = views
+        self.last_check = checked_at
+        return changed
+
     def __str__(self):
         return f"{self.companyName or ''} {self.productName}"
 
@@ -7,7 +7,6 @@ from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message, BufferedInputFile
 
-from bot.database.models.price_history import PriceHistory
 from bot.database.models.product_link import ProductLink
 from bot.filters.admin import AdminFilter
 from bot.fsm.link import TableStates
@@ -17,9 +16,17 @@ from bot.services.file_handlers import FileProcessor
 from bot.services.group import GroupService
 from bot.services.link import LinkService, TableHandler
 from bot.tasks.parse import parse_single_group
+from bot.tasks.reports import CachedReport, ReportRejectedError, report_cache, report_queue
 from bot.utils.callback import parse_callback
+from bot.utils.export import export_history_csv, export_history_parquet
 from bot.utils.group import _get_group_info_text, _get_add_table_info_text
-from bot.utils.link import _process_links, generate_price_diff_excel, generate_total_views_diff_excel
+from bot.utils.link import (
+    LinkImportResult,
+    _process_links,
+    generate_history_excel,
+    generate_price_diff_excel,
+    generate_total_views_diff_excel,
+)
 from core.config import load_config
 
 logger = logging.getLogger(__name__)
@@ -27,6 +34,12 @@ logger = logging.getLogger(__name__)
 config = load_config()
 admin_ids = config.tg_bot.admin_ids
 
+# Форматы выгрузки полной истории: callback -> (функция выгрузки, название формата)
+EXPORT_FORMATS = {
+    "csv": (export_history_csv, "CSV.gz"),
+    "parquet": (export_history_parquet, "Parquet"),
+}
+
 router = Router()
 router.message.filter(AdminFilter(admin_ids))
 running_tasks: Dict[int, asyncio.Task] = {}
@@ -55,6 +68,66 @@ async def _update_parser_status_and_respond(
     )
 
 
+async def _submit_report(callback: CallbackQuery, job, error_text: str) -> None:
+    """Ставит формирование отчёта в очередь и сразу отвечает на нажатие кнопки"""
+
+    async def run():
+        try:
+            await job()
+        except Exception as e:
+            logger.error(f"Ошибка при формировании отчёта: {e}")
+            await callback.message.answer(error_text)
+
+    try:
+        report_queue.submit(callback.from_user.id, run)
+    except ReportRejectedError as e:
+        await callback.answer(str(e), show_alert=True)
+        return
+    await callback.answer("⏳ Отчёт формируется, файл придёт отдельным сообщением")
+
+
+async def _send_report(callback: CallbackQuery, group, site_id: int, report: CachedReport) -> None:
+    """Отправляет отчёт и карточку группы; повторная отправка использует file_id без загрузки файла"""
+    document = report.file_id or BufferedInputFile(report.data, filename=report.filename)
+    message = await callback.message.answer_document(document, caption=report.caption)
+    if report.file_id is None and message.document:
+        report.file_id = message.document.file_id
+
+    await _send_group_info(callback, group, site_id)
+
+
+async def _send_group_info(callback: CallbackQuery, group, site_id: int) -> None:
+    """Отправляет карточку группы с клавиатурой после отчёта"""
+    group_info_text = await _get_group_info_text(group.id)
+    await callback.message.answer(
+        group_info_text,
+        reply_markup=group_detail_keyboard(group.id, site_id, group.is_active)
+    )
+
+
+async def _deliver_report(callback: CallbackQuery, group, site_id: int, report_type: str, build, error_text: str):
+    """
+    Отправляет отчёт из кэша, если данные группы не менялись, иначе ставит его построение в очередь.
+    build возвращает CachedReport или None, если отчёт строить не из чего.
+    """
+    # Версия берётся до чтения данных: запись во время построения сделает отчёт в кэше устаревшим
+    version = group.data_version
+    cached = report_cache.get(group.id, report_type, version)
+    if cached is not None:
+        await callback.answer()
+        await _send_report(callback, group, site_id, cached)
+        return
+
+    async def job():
+        report = await build()
+        if report is None:
+            return
+        report_cache.put(group.id, report_type, version, report)
+        await _send_report(callback, group, site_id, report)
+
+    await _submit_report(callback, job, error_text)
+
+
 def _prepare_links_data(links, is_final: bool = False) -> list:
     """Подготавливает данные ссылок для Excel"""
     if is_final:
@@ -73,21 +146,14 @@ def _prepare_links_data(links, is_final: bool = False) -> list:
         } for link in links]
 
 
-async def _prepare_olx_links_data(links) -> list:
+def _prepare_olx_links_data(links: list) -> list:
     """Подготавливает данные ссылок для Excel"""
-    result = []
-
-    for link in links:
-        last_history = await PriceHistory.filter(product_link_id=link.id).order_by("-date").first()
-        current_views = last_history.views if last_history is not None else 0
-        result.append({
-            "Название продукта": link.productName,
-            "Ссылка на товар": link.url,
-            "Кол-во просмотров": current_views,
-            "Дата последней проверки": link.last_check.strftime("%d.%m.%Y") if link.last_check else "N/A"
-        }
-        )
-    return result
+    return [{
+        "Название продукта": link.productName,
+        "Ссылка на товар": link.url,
+        "Кол-во просмотров": link.last_views or 0,
+        "Дата последней проверки": link.last_check.strftime("%d.%m.%Y") if link.last_check else "N/A"
+    } for link in links]
 
 
 @router.callback_query(F.data.startswith("add_table_"))
@@ -128,17 +194,21 @@ async def upload_table(message: Message, state: FSMContext):
         file_bytes = io.BytesIO()
         await message.bot.download(message.document.file_id, destination=file_bytes)
 
-        # Валидация и чтение файла
-        df = await FileProcessor.process_file(file_bytes, message.document.file_name, site_title)
-
-        # Обработка ссылок
-        created_count = await _process_links(df["Ссылка на товар"], group_id, site_title)
+        # Потоковое чтение колонки со ссылками и загрузка частями: таблица целиком в память не попадает.
+        # Повторы между частями отсекаются уникальным ключом и считаются уже добавленными
+        result = LinkImportResult()
+        async for urls in FileProcessor.iter_column(file_bytes, message.document.file_name):
+            result += await _process_links(urls, group_id, site_title)
 
         # Генерация ответа
         group_info_text = await _get_group_info_text(group_id)
         group = await GroupService.get_group(group_id)
 
-        await message.answer(f'✅ Успешно добавлено {created_count} ссылок')
+        await message.answer(
+            f'✅ Успешно добавлено {result.inserted} ссылок\n'
+            f'Пропущено: {result.skipped} '
+            f'(уже в группе: {result.existing}, повторы в файле: {result.duplicates}, неверные: {result.invalid})'
+        )
         await message.answer(
             group_info_text,
             reply_markup=group_detail_keyboard(group_id, site_id, group.is_active),
@@ -161,23 +231,18 @@ async def view_table_handler(callback: CallbackQuery):
         _, _, group_id, site_id = parse_callback(callback.data)
 
         group = await GroupService.get_group(group_id)
-        links = await ProductLink.filter(group_id=group_id).all()
-
-        if not links:
+        if not await ProductLink.filter(group_id=group_id).exists():
             await callback.answer("ℹ️ В этой группе пока нет ссылок для анализа.")
             return
 
-        # Подготовка данных для Excel
-        links_data = _prepare_links_data(links, is_final=False)
-        excel_file = TableHandler.create_excel_with_autofit(links_data, group)
-        group_info_text = await _get_group_info_text(group_id)
+        # Ссылки читаются только при построении: отчёт из кэша отправляется без запроса к ним
+        async def build_table():
+            links = await ProductLink.filter(group_id=group_id).all()
+            links_data = _prepare_links_data(links, is_final=False)
+            excel_file = await TableHandler.create_excel_with_autofit(links_data, group)
+            return CachedReport(excel_file.data, excel_file.filename, 'Входная таблица')
 
-        await callback.message.answer_document(excel_file, caption='Входная таблица')
-        await callback.message.answer(
-            group_info_text,
-            reply_markup=group_detail_keyboard(group.id, site_id, group.is_active)
-        )
-        await callback.answer()
+        await _deliver_report(callback, group, site_id, "input_table", build_table, "❌ Ошибка при генерации таблицы")
 
     except Exception as e:
         logger.error(f"Ошибка в view_table_handler: {e}")
@@ -311,32 +376,27 @@ async def view_final_table(callback: CallbackQuery):
         await group.fetch_related('site')
         site = group.site
 
-        links = await ProductLink.filter(group_id=group_id).all()
-        if not links:
+        if not await ProductLink.filter(group_id=group_id).exists():
             await callback.answer("❌ В этой группе пока нет ссылок.")
             return
 
         if site.title == 'SATU KZ':
             # Проверка наличия цен
-            has_prices = any(link.last_price is not None for link in links)
-            if not has_prices:
+            if not await ProductLink.filter(group_id=group_id, last_price__isnull=False).exists():
                 await callback.answer("❌ Парсинг ещё не был выполнен.")
                 return
 
-        # Подготовка данных
-        if site.title == 'SATU KZ':
-            links_data = _prepare_links_data(links, is_final=True)
-        else:
-            links_data = await _prepare_olx_links_data(links)
+        # Ссылки читаются только при построении: отчёт из кэша отправляется без запроса к ним
+        async def build_table():
+            links = await ProductLink.filter(group_id=group_id).all()
+            if site.title == 'SATU KZ':
+                links_data = _prepare_links_data(links, is_final=True)
+            else:
+                links_data = _prepare_olx_links_data(links)
+            excel_file = await TableHandler.create_excel_with_autofit(links_data, group)
+            return CachedReport(excel_file.data, excel_file.filename, "Выходная таблица с данными")
 
-        excel_file = TableHandler.create_excel_with_autofit(links_data, group)
-        group_info_text = await _get_group_info_text(group_id)
-
-        await callback.message.answer_document(excel_file, caption="Выходная таблица с данными")
-        await callback.message.answer(
-            group_info_text,
-            reply_markup=group_detail_keyboard(group.id, site_id, group.is_active)
-        )
+        await _deliver_report(callback, group, site_id, "final_table", build_table, "❌ Ошибка при генерации таблицы")
 
     except Exception as e:
         logger.error(f"Ошибка в view_final_table: {e}")
@@ -353,47 +413,88 @@ async def price_analysis(callback: CallbackQuery):
         await group.fetch_related('site')
         site = group.site
 
-        if site == 'SATU KZ':
-            excel_file = await generate_price_diff_excel(group_id)
-            if not excel_file:
-                await callback.answer("❌ Нет данных для анализа цен")
-                return
-        else:
-            excel_file = await generate_total_views_diff_excel(group_id)
+        async def build_analysis():
+            if site.title == 'SATU KZ':
+                excel_file = await generate_price_diff_excel(group_id)
+                if not excel_file:
+                    await callback.message.answer("❌ Нет данных для анализа цен")
+                    return None
+                caption = f"📊 Анализ цен группы {group.title}"
+            else:
+                excel_file = await generate_total_views_diff_excel(group_id)
+                if not excel_file:
+                    await callback.message.answer("❌ Нет данных для анализа просмотров")
+                    return None
+                caption = f"📊 Анализ просмотров группы {group.title}"
+
+            return CachedReport(excel_file.getvalue(), f"Анализ_группы_{group.title}.xlsx", caption)
+
+        await _deliver_report(callback, group, site_id, "analysis", build_analysis, "❌ Ошибка при анализе цен")
+
+    except Exception as e:
+        logger.error(f"Ошибка в price_analysis: {e}")
+        await callback.answer("❌ Ошибка при анализе цен")
 
+
+@router.callback_query(F.data.startswith("history_report_"))
+async def history_report(callback: CallbackQuery):
+    """Отчёт по всей истории группы: значения по дням и сводные колонки"""
+    try:
+        _, _, group_id, site_id = parse_callback(callback.data)
+
+        group = await GroupService.get_group(group_id)
+        await group.fetch_related('site')
+        site = group.site
+
+        async def build_history():
+            excel_file = await generate_history_excel(group.id, site.title)
             if not excel_file:
-                await callback.answer("❌ Нет данных для анализа просмотров")
-                return
+                await callback.message.answer("❌ В группе пока нет истории")
+                return None
+            value_title = "цен" if site.title == 'SATU KZ' else "просмотров"
+            caption = f"🗓 История {value_title} группы {group.title} по дням"
+            return CachedReport(excel_file.getvalue(), f"История_группы_{group.title}.xlsx", caption)
 
-        group_info_text = await _get_group_info_text(group_id)
+        await _deliver_report(callback, group, site_id, "history", build_history, "❌ Ошибка при формировании истории")
 
-        if site == 'SATU KZ':
-            await callback.message.answer_document(
-                document=BufferedInputFile(
-                    excel_file.getvalue(),
-                    filename=f"Анализ_группы_{group.title}.xlsx"
-                ),
-                caption=f"📊 Анализ цен группы {group.title}"
-            )
-        else:
-            await callback.message.answer_document(
-                document=BufferedInputFile(
-                    excel_file.getvalue(),
-                    filename=f"Анализ_группы_{group.title}.xlsx"
-                ),
-                caption=f"📊 Анализ просмотров группы {group.title}"
-            )
+    except Exception as e:
+        logger.error(f"Ошибка в history_report: {e}")
+        await callback.answer("❌ Ошибка при формировании истории")
 
-        await callback.message.answer(
-            text=group_info_text,
-            reply_markup=group_detail_keyboard(
-                group_id=group_id,
-                site_id=site_id,
-                is_parser_active=group.is_active
+
+@router.callback_query(F.data.startswith("export_"))
+async def export_history(callback: CallbackQuery):
+    """Выгрузка полной истории группы в CSV.gz или Parquet, при необходимости частями"""
+    try:
+        _, export_format, group_id, site_id = parse_callback(callback.data)
+        export, format_title = EXPORT_FORMATS[export_format]
+
+        group = await GroupService.get_group(group_id)
+
+        caption = f"📦 История группы {group.title} ({format_title})"
+        retention_months = config.parser.history_retention_months
+        if retention_months > 0:
+            # Выгрузка содержит только подробную историю, удалённые месяцы есть лишь в сводках
+            caption += (
+                f"\nПодробная история хранится {retention_months} мес., "
+                f"более ранние дни — в отчёте «История по дням»"
             )
-        )
-        await callback.answer()
+
+        async def job():
+            parts = 0
+            async for filename, data in export(group.id, f"История_группы_{group.title}"):
+                parts += 1
+                await callback.message.answer_document(
+                    BufferedInputFile(data, filename=filename),
+                    caption=caption
+                )
+            if not parts:
+                await callback.message.answer("❌ В группе пока нет истории для выгрузки")
+                return
+            await _send_group_info(callback, group, site_id)
+
+        await _submit_report(callback, job, "❌ Ошибка при выгрузке истории")
 
     except Exception as e:
-        logger.error(f"Ошибка в price_analysis: {e}")
-        await callback.answer("❌ Ошибка при анализе цен")
+        logger.error(f"Ошибка в export_history: {e}")
+        await callback.answer("❌ Ошибка при выгрузке истории")
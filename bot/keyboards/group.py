@@ -70,8 +70,13 @@ def group_detail_keyboard(group_id: int, site_id: int, is_parser_active: bool =
     # Новые кнопки
     builder.button(text = "⏭ Принудительный запуск", callback_data = f"force_start_{group_id}_{site_id}")
     builder.button(text = "📈 Получение анализа", callback_data = f"price_analysis_{group_id}_{site_id}")
+    builder.button(text = "🗓 История по дням", callback_data = f"history_report_{group_id}_{site_id}")
 
-    builder.adjust(2, 2, 2, 1, 1)
+    # Выгрузка полной истории в компактных форматах
+    builder.button(text = "🗜 История CSV.gz", callback_data = f"export_csv_{group_id}_{site_id}")
+    builder.button(text = "🧱 История Parquet", callback_data = f"export_parquet_{group_id}_{site_id}")
+
+    builder.adjust(2, 2, 2, 2, 2)
     builder.row(InlineKeyboardButton(text = "⬅️ Назад к списку групп", callback_data = f"read_groups_{site_id}"))
     return builder.as_markup()
 
@@ -7,7 +7,9 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from bot.handlers import start, site, group, link
-from bot.tasks.parse import  parse_satu_groups, parse_olx_groups
+from bot.tasks.maintenance import maintain_price_history
+from bot.tasks.parse import  parse_satu_groups, parse_olx_groups, shutdown_parse_executor, http_client
+from bot.tasks.reports import report_queue
 from core.config import load_config
 
 
@@ -43,9 +45,15 @@ async def main():
     config = load_config()
     dp = Dispatcher(storage = MemoryStorage())
 
+    # Общий HTTP-клиент парсера живёт столько же, сколько бот
+    http_client.start()
+    # Очередь отчётов по кнопкам пользователей
+    report_queue.start()
+
     scheduler = AsyncIOScheduler(timezone = 'Europe/Moscow')
     scheduler.add_job(parse_satu_groups, trigger = 'cron', hour = 9, minute = 3)
     scheduler.add_job(parse_olx_groups, trigger='interval', minutes=60)
+    scheduler.add_job(maintain_price_history, trigger = 'cron', hour = 3, minute = 30)
     scheduler.start()
 
     # Регистрируем роутеры
@@ -60,4 +68,9 @@ async def main():
 
     )
 
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await http_client.close()
+        await report_queue.close()
+        shutdown_parse_executor()
@@ -1,65 +1,140 @@
+import asyncio
+import codecs
 import io
 import logging
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterator
 
 import pandas as pd
-from pandas import DataFrame
+from openpyxl import load_workbook
 
 logger = logging.getLogger(__name__)
 
+# Сколько строк таблицы передаётся дальше за один раз при потоковом чтении
+READ_CHUNK_SIZE = 5000
+# По скольким первым байтам CSV определяется кодировка
+ENCODING_PREFIX_SIZE = 64 * 1024
+CSV_ENCODINGS = ('utf-8-sig', 'cp1251')
+
+
+class MissingColumnError(ValueError):
+    """В таблице нет обязательной колонки."""
+
+    def __init__(self, column: str):
+        super().__init__(f"В таблице отсутствуют обязательные колонки: {column}")
+
 
 class FileHandlerStrategy(ABC):
     """Абстрактный класс стратегии для обработки файлов"""
 
     @abstractmethod
-    async def validate_and_read(self, file_bytes: io.BytesIO) -> DataFrame:
+    def get_supported_extensions(self) -> list[str]:
+        """Возвращает список поддерживаемых расширений"""
         pass
 
     @abstractmethod
-    def get_supported_extensions(self) -> list[str]:
-        """Возвращает список поддерживаемых расширений"""
+    def iter_column(self, file_bytes: io.BytesIO, column: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[pd.Series]:
+        """Читает только одну колонку таблицы частями по chunk_size строк"""
         pass
 
 
 class ExcelFileHandler(FileHandlerStrategy):
     """Обработчик Excel файлов"""
 
-    async def validate_and_read(self, file_bytes: io.BytesIO) -> DataFrame:
+    def iter_column(self, file_bytes: io.BytesIO, column: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[pd.Series]:
+        # Формат xls не читается потоково: загружается только нужная колонка
+        file_bytes.seek(0)
         try:
-            file_bytes.seek(0)
-            return pd.read_excel(file_bytes)
+            header = pd.read_excel(file_bytes, nrows=0)
         except Exception as e:
             logger.error(f"Ошибка чтения Excel файла: {e}")
             raise ValueError("Невозможно прочитать Excel файл. Проверьте формат.")
+        if column not in header.columns:
+            raise MissingColumnError(column)
+
+        file_bytes.seek(0)
+        values = pd.read_excel(file_bytes, usecols=[column])[column]
+        for start in range(0, len(values), chunk_size):
+            yield values.iloc[start:start + chunk_size]
 
     def get_supported_extensions(self) -> list[str]:
         return ['.xlsx', '.xls']
 
 
-class CSVFileHandler(FileHandlerStrategy):
-    """Обработчик CSV файлов"""
+class XlsxFileHandler(ExcelFileHandler):
+    """Обработчик xlsx с потоковым чтением через openpyxl в режиме read_only"""
 
-    async def validate_and_read(self, file_bytes: io.BytesIO) -> DataFrame:
+    def iter_column(self, file_bytes: io.BytesIO, column: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[pd.Series]:
+        file_bytes.seek(0)
         try:
-            file_bytes.seek(0)
-            content = file_bytes.read().decode('utf-8')
-            return pd.read_csv(io.StringIO(content))
-        except UnicodeDecodeError:
-            # Попробуем другие кодировки
-            try:
-                file_bytes.seek(0)
-                content = file_bytes.read().decode('cp1251')
-                return pd.read_csv(io.StringIO(content))
-            except Exception as e:
-                logger.error(f"Ошибка чтения CSV файла: {e}")
-                raise ValueError("Невозможно прочитать CSV файл. Проверьте кодировку.")
+            workbook = load_workbook(file_bytes, read_only=True, data_only=True)
         except Exception as e:
-            logger.error(f"Ошибка чтения CSV файла: {e}")
-            raise ValueError("Невозможно прочитать CSV файл. Проверьте формат.")
+            logger.error(f"Ошибка чтения Excel файла: {e}")
+            raise ValueError("Невозможно прочитать Excel файл. Проверьте формат.")
+
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            if column not in header:
+                raise MissingColumnError(column)
+            idx = header.index(column)
+
+            chunk = []
+            for row in rows:
+                chunk.append(row[idx] if idx < len(row) else None)
+                if len(chunk) >= chunk_size:
+                    yield pd.Series(chunk, dtype=object)
+                    chunk = []
+            if chunk:
+                yield pd.Series(chunk, dtype=object)
+        finally:
+            workbook.close()
+
+    def get_supported_extensions(self) -> list[str]:
+        return ['.xlsx']
+
+
+class CSVFileHandler(FileHandlerStrategy):
+    """Обработчик CSV файлов"""
 
     def get_supported_extensions(self) -> list[str]:
         return ['.csv']
 
+    @staticmethod
+    def detect_encoding(file_bytes: io.BytesIO) -> str:
+        """Определяет кодировку по первым ENCODING_PREFIX_SIZE байтам файла."""
+        file_bytes.seek(0)
+        prefix = file_bytes.read(ENCODING_PREFIX_SIZE)
+        for encoding in CSV_ENCODINGS:
+            try:
+                # Неполный многобайтовый символ на конце префикса не считается ошибкой
+                codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("Невозможно прочитать CSV файл. Проверьте кодировку.")
+
+    def iter_column(self, file_bytes: io.BytesIO, column: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[pd.Series]:
+        encoding = self.detect_encoding(file_bytes)
+        file_bytes.seek(0)
+        try:
+            reader = pd.read_csv(
+                file_bytes,
+                encoding=encoding,
+                usecols=lambda name: name == column,
+                dtype=str,
+                chunksize=chunk_size,
+            )
+            for chunk in reader:
+                if column not in chunk.columns:
+                    raise MissingColumnError(column)
+                yield chunk[column]
+        except (ValueError, UnicodeDecodeError) as e:
+            if isinstance(e, MissingColumnError):
+                raise
+            logger.error(f"Ошибка чтения CSV файла: {e}")
+            raise ValueError("Невозможно прочитать CSV файл. Проверьте формат.")
+
 
 class FileHandlerFactory:
     """Фабрика для создания обработчиков файлов"""
@@ -101,7 +176,7 @@ class FileHandlerFactory:
     @classmethod
     def _register_default_handlers(cls) -> None:
         """Регистрирует стандартные обработчики"""
-        cls.register_handler('.xlsx', ExcelFileHandler())
+        cls.register_handler('.xlsx', XlsxFileHandler())
         cls.register_handler('.xls', ExcelFileHandler())
         cls.register_handler('.csv', CSVFileHandler())
 
@@ -119,50 +194,36 @@ class FileProcessor:
     REQUIRED_COLUMNS = ['Ссылка на товар']
 
     @staticmethod
-    async def process_file(file_bytes: io.BytesIO, filename: str, site_title: str) -> DataFrame:
+    async def iter_column(
+            file_bytes: io.BytesIO,
+            filename: str,
+            column: str = REQUIRED_COLUMNS[0],
+            chunk_size: int = READ_CHUNK_SIZE,
+    ) -> AsyncIterator[pd.Series]:
         """
-        Обрабатывает файл и возвращает DataFrame с валидацией бизнес-правил
+        Потоково читает из файла только нужную колонку частями по chunk_size строк.
+        Каждая часть разбирается в отдельном потоке, чтобы не блокировать event loop.
         """
+        handler = FileHandlerFactory.create_handler(filename)
+        chunks = handler.iter_column(file_bytes, column, chunk_size)
+        empty = True
         try:
-            # Создаем обработчик и читаем файл
-            handler = FileHandlerFactory.create_handler(filename)
-            df = await handler.validate_and_read(file_bytes)
-
-            # Базовая валидация данных
-            if df.empty:
-                raise ValueError("Файл не содержит данных")
-
-            # Валидация обязательных колонок (бизнес-правило)
-            missing_columns = [
-                col for col in FileProcessor.REQUIRED_COLUMNS
-                if col not in df.columns
-            ]
-
-            if missing_columns:
-                raise ValueError(
-                    f"В таблице отсутствуют обязательные колонки: {', '.join(missing_columns)}"
-                )
-
-
-            if site_title == "SATU KZ":
-                # Дополнительная валидация URL (опционально)
-                if 'Ссылка на товар' in df.columns:
-                    invalid_urls = df[~df['Ссылка на товар'].str.startswith('https://satu.kz/', na=False)]
-                    if not invalid_urls.empty:
-                        logger.warning(f"Найдено {len(invalid_urls)} ссылок не с satu.kz")
-            else:
-                # Дополнительная валидация URL (опционально)
-                if 'Ссылка на товар' in df.columns:
-                    invalid_urls = df[~df['Ссылка на товар'].str.startswith('https://www.olx.kz/', na=False)]
-                    if not invalid_urls.empty:
-                        logger.warning(f"Найдено {len(invalid_urls)} ссылок не с www.olx.kz")
-
-            return df
-
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk.empty:
+                    continue
+                empty = False
+                yield chunk
         except ValueError as e:
-            # Перебрасываем известные ошибки валидации
             logger.warning(f"Ошибка валидации файла {filename}: {e}")
-            raise e
+            raise
         except Exception as e:
             logger.error(f"Неожиданная ошибка при обработке файла {filename}: {e}")
             raise ValueError(f"Ошибка обработки файла: {str(e)}")
+        finally:
+            chunks.close()
+
+        if empty:
+            raise ValueError("Файл не содержит данных")
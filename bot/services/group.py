@@ -1,5 +1,7 @@
 from typing import Optional
 
+from tortoise.expressions import F
+
 from bot.database.models.product_group import ProductGroup
 from bot.database.models.site import Site
 from bot.database.models.user import User
@@ -38,10 +40,18 @@ class GroupService:
         group = await ProductGroup.get_or_none(id = group_id)
         if group:
             group.is_active = is_active
-            await group.save()
+            await group.save(update_fields = ["is_active"])
 
         return group
 
+    @staticmethod
+    async def bump_data_version(group_id: int, using_db = None) -> None:
+        """Отмечает изменение данных группы: готовые отчёты по ней становятся неактуальными"""
+        query = ProductGroup.filter(id = group_id)
+        if using_db is not None:
+            query = query.using_db(using_db)
+        await query.update(data_version = F("data_version") + 1)
+
     @staticmethod
     async def delete_group(group_id: int):
         """
@@ -0,0 +1,299 @@
+import io
+from datetime import datetime
+from typing import AsyncIterator
+
+from tortoise import connections
+
+
+# Последняя, предпоследняя и первая записи истории по каждой ссылке группы (используется для заполнения снимка).
+# Каждый LATERAL-подзапрос читает 1–2 строки по индексу (product_link_id, date DESC),
+# поэтому время запроса не растёт вместе с историей.
+GROUP_SNAPSHOT_SQL = """
+SELECT l.id AS link_id,
+       l.url,
+       l."productName" AS product_name,
+       l."companyName" AS company_name,
+       l.last_check,
+       h_last.price AS last_price,
+       h_last.views AS last_views,
+       COALESCE(h_last.valid_to, h_last.date) AS last_date,
+       h_last.date AS last_start,
+       h_last.checks AS last_checks,
+       h_prev.price AS prev_price,
+       h_prev.views AS prev_views,
+       h_prev.date AS prev_date,
+       h_first.price AS first_price,
+       h_first.views AS first_views,
+       h_first.date AS first_date
+FROM productlink l
+LEFT JOIN LATERAL (
+    SELECT price, views, date, valid_to, checks FROM pricehistory
+    WHERE product_link_id = l.id ORDER BY date DESC LIMIT 1
+) h_last ON TRUE
+LEFT JOIN LATERAL (
+    SELECT price, views, date FROM pricehistory
+    WHERE product_link_id = l.id ORDER BY date DESC OFFSET 1 LIMIT 1
+) h_prev ON TRUE
+LEFT JOIN LATERAL (
+    SELECT price, views, date FROM pricehistory
+    WHERE product_link_id = l.id ORDER BY date LIMIT 1
+) h_first ON TRUE
+WHERE l.group_id = $1
+ORDER BY l.id
+"""
+
+# Заполнение снимка истории в productlink по уже накопленной истории группы.
+# Последнее изменение значения — самая поздняя запись, где цена или просмотры отличаются от предыдущей записи.
+# Если последняя запись покрывает несколько проверок, предыдущая проверка имела то же значение;
+# её дата берётся по началу записи (точно при двух проверках).
+BACKFILL_SNAPSHOT_SQL = f"""
+WITH s AS ({GROUP_SNAPSHOT_SQL})
+UPDATE productlink AS l
+SET last_views = s.last_views,
+    prev_price = CASE WHEN s.last_checks > 1 THEN s.last_price ELSE s.prev_price END,
+    prev_views = CASE WHEN s.last_checks > 1 THEN s.last_views ELSE s.prev_views END,
+    prev_check = CASE WHEN s.last_checks > 1 THEN s.last_start ELSE s.prev_date END,
+    first_price = s.first_price,
+    first_views = s.first_views,
+    first_check = s.first_date,
+    last_change = c.last_change
+FROM s
+LEFT JOIN LATERAL (
+    SELECT max(changes.date) AS last_change
+    FROM (
+        SELECT date,
+               ROW_NUMBER() OVER w = 1
+                   OR (price, views) IS DISTINCT FROM (LAG(price) OVER w, LAG(views) OVER w) AS changed
+        FROM pricehistory
+        WHERE product_link_id = s.link_id
+        WINDOW w AS (ORDER BY date, id)
+    ) changes
+    WHERE changes.changed
+) c ON TRUE
+WHERE l.id = s.link_id
+RETURNING l.id
+"""
+
+# Анализ цен группы: последняя и предыдущая цена, разница и процент одним запросом.
+# Читает только снимок в productlink, история не затрагивается.
+# Колонки называются так же, как в отчёте, чтобы результат сразу шёл в DataFrame.
+PRICE_DIFF_SQL = """
+SELECT l."companyName" AS "Компания",
+       l."productName" AS "Товар",
+       l.prev_price AS "Предыдущая цена",
+       l.last_price AS "Последняя цена",
+       CASE WHEN l.prev_check IS NOT NULL THEN l.last_price - l.prev_price END AS "Разница",
+       CASE
+           WHEN l.prev_check IS NULL THEN NULL
+           WHEN l.prev_price <> 0 THEN (l.last_price - l.prev_price) * 100.0 / l.prev_price
+           ELSE 0
+       END AS "%",
+       CASE
+           WHEN l.prev_check IS NULL THEN 'ℹ️ Данных недостаточно'
+           WHEN l.last_price > l.prev_price THEN '🔺'
+           WHEN l.last_price < l.prev_price THEN '🔻'
+           ELSE '➖'
+       END AS "Символ",
+       l.url AS "Ссылка"
+FROM productlink l
+WHERE l.group_id = $1
+ORDER BY l.id
+"""
+
+# Продление последней записи истории ссылок, у которых значение не изменилось.
+# $1 — id ссылок, $2 — даты проверок; последняя запись каждой ссылки находится по индексу.
+EXTEND_HISTORY_SQL = """
+UPDATE pricehistory AS h
+SET valid_to = v.checked_at,
+    checks = h.checks + 1
+FROM unnest($1::int[], $2::timestamptz[]) AS v(link_id, checked_at)
+WHERE h.id = (
+    SELECT id FROM pricehistory
+    WHERE product_link_id = v.link_id
+    ORDER BY date DESC, id DESC
+    LIMIT 1
+)
+"""
+
+# Сжатие истории группы, записанной по строке на проверку: подряд идущие записи с одинаковым
+# значением сливаются в первую из них (valid_to и checks покрывают все проверки), остальные удаляются.
+COMPACT_HISTORY_SQL = """
+WITH marked AS (
+    SELECT h.id,
+           h.product_link_id,
+           h.date,
+           COALESCE(h.valid_to, h.date) AS valid_to,
+           h.checks,
+           CASE
+               WHEN ROW_NUMBER() OVER w = 1
+                   OR (h.price, h.views) IS DISTINCT FROM (LAG(h.price) OVER w, LAG(h.views) OVER w)
+               THEN 1 ELSE 0
+           END AS changed
+    FROM pricehistory h
+    JOIN productlink l ON l.id = h.product_link_id
+    WHERE l.group_id = $1
+    WINDOW w AS (PARTITION BY h.product_link_id ORDER BY h.date, h.id)
+), runs AS (
+    SELECT *, SUM(changed) OVER (PARTITION BY product_link_id ORDER BY date, id) AS run
+    FROM marked
+), merged AS (
+    SELECT product_link_id,
+           run,
+           (array_agg(id ORDER BY date, id))[1] AS keep_id,
+           max(valid_to) AS valid_to,
+           sum(checks) AS checks
+    FROM runs
+    GROUP BY product_link_id, run
+    HAVING count(*) > 1
+), kept AS (
+    UPDATE pricehistory AS h
+    SET valid_to = m.valid_to,
+        checks = m.checks
+    FROM merged m
+    WHERE h.id = m.keep_id
+)
+DELETE FROM pricehistory AS h
+USING runs r, merged m
+WHERE h.id = r.id
+  AND r.product_link_id = m.product_link_id
+  AND r.run = m.run
+  AND h.id <> m.keep_id
+RETURNING h.id
+"""
+
+
+# Выгрузка полной истории группы идёт страницами по ссылкам: следующая страница ссылок
+# выбирается по id после последней (keyset), история страницы читается по индексу (product_link_id, date DESC).
+EXPORT_LINKS_SQL = """
+SELECT id FROM productlink
+WHERE group_id = $1 AND id > $2
+ORDER BY id
+LIMIT $3
+"""
+EXPORT_HISTORY_SQL = """
+SELECT h.product_link_id AS link_id,
+       l.url,
+       l."productName" AS product_name,
+       l."companyName" AS company_name,
+       h.price,
+       h.views,
+       h.date,
+       h.valid_to,
+       h.checks
+FROM pricehistory h
+JOIN productlink l ON l.id = h.product_link_id
+WHERE h.product_link_id = ANY($1::int[])
+ORDER BY h.product_link_id, h.date
+"""
+HISTORY_EXPORT_COLUMNS = (
+    "link_id", "url", "product_name", "company_name", "price", "views", "date", "valid_to", "checks",
+)
+
+# Последнее значение каждой ссылки группы за каждый день, в котором начиналась запись истории.
+# valid_until — последний день, покрытый записью (записи продлеваются при неизменном значении).
+# Дни до первой сохранившейся записи ссылки (секции, удалённые по сроку хранения) берутся из дневных сводок.
+# Результат выгружается через COPY в CSV; дни отдаются числом дней от 1970-01-01, чтобы pandas разбирал их без дат.
+DAILY_HISTORY_SQL = """
+WITH links AS (
+    SELECT l.id,
+           (SELECT min(date) FROM pricehistory WHERE product_link_id = l.id)::date AS first_day
+    FROM productlink l
+    WHERE l.group_id = $1
+)
+SELECT * FROM (
+    SELECT DISTINCT ON (h.product_link_id, h.date::date)
+           h.product_link_id AS link_id,
+           h.date::date - DATE '1970-01-01' AS day,
+           h.price,
+           h.views,
+           COALESCE(h.valid_to, h.date)::date - DATE '1970-01-01' AS valid_until
+    FROM pricehistory h
+    JOIN links l ON l.id = h.product_link_id
+    ORDER BY h.product_link_id, h.date::date, h.date DESC
+) h
+UNION ALL
+SELECT r.product_link_id,
+       r.period_start::date - DATE '1970-01-01',
+       r.last_price,
+       r.last_views,
+       r.period_start::date - DATE '1970-01-01'
+FROM pricehistoryrollup r
+JOIN links l ON l.id = r.product_link_id
+WHERE r.period = 'day'
+  AND (l.first_day IS NULL OR r.period_start::date < l.first_day)
+"""
+
+class PriceHistoryService:
+
+    @staticmethod
+    async def get_price_diff(group_id: int) -> list[dict]:
+        """
+        Возвращает строки отчёта «Анализ цен» для всех ссылок группы:
+        предыдущая и последняя цена, разница, процент и символ изменения.
+        """
+        return await connections.get("default").execute_query_dict(PRICE_DIFF_SQL, [int(group_id)])
+
+    @staticmethod
+    async def backfill_snapshots(group_id: int) -> int:
+        """
+        Заполняет снимок истории (предыдущая и первая проверка, последнее изменение)
+        у ссылок группы по записям PriceHistory. Возвращает количество обновлённых ссылок.
+        """
+        rows_affected, _ = await connections.get("default").execute_query(BACKFILL_SNAPSHOT_SQL, [int(group_id)])
+        return rows_affected
+
+    @staticmethod
+    async def extend_latest(entries: list[tuple[int, datetime]], using_db=None) -> None:
+        """
+        Продлевает последнюю запись истории каждой ссылки до даты проверки
+        вместо добавления новой записи с тем же значением.
+        entries — пары (id ссылки, дата проверки).
+        """
+        if not entries:
+            return
+        conn = using_db or connections.get("default")
+        link_ids = [link_id for link_id, _ in entries]
+        checked_at = [date for _, date in entries]
+        await conn.execute_query(EXTEND_HISTORY_SQL, [link_ids, checked_at])
+
+    @staticmethod
+    async def compact_history(group_id: int) -> int:
+        """
+        Сливает подряд идущие записи истории ссылок группы с одинаковым значением.
+        Возвращает количество удалённых записей.
+        """
+        rows_affected, _ = await connections.get("default").execute_query(COMPACT_HISTORY_SQL, [int(group_id)])
+        return rows_affected
+
+    @staticmethod
+    async def get_daily_history(group_id: int) -> io.BytesIO:
+        """
+        Возвращает дневную историю ссылок группы (последнее значение за день) как CSV
+        с заголовком. Выгружается одним запросом через COPY: год истории большой группы
+        читается pandas из CSV в разы быстрее и с меньшей памятью, чем из строк asyncpg.
+        """
+        output = io.BytesIO()
+        async with connections.get("default").acquire_connection() as conn:
+            await conn.copy_from_query(DAILY_HISTORY_SQL, int(group_id), output=output, format="csv", header=True)
+        output.seek(0)
+        return output
+
+    @staticmethod
+    async def iter_history(group_id: int, links_per_page: int = 50) -> AsyncIterator[list]:
+        """
+        Читает полную историю ссылок группы страницами по links_per_page ссылок.
+        Каждая страница — отдельные короткие запросы: пока вызывающий код обрабатывает
+        страницу, соединение возвращено в пул и транзакция не держится.
+        Колонки строк — HISTORY_EXPORT_COLUMNS.
+        """
+        conn = connections.get("default")
+        last_id = 0
+        while True:
+            links = await conn.execute_query_dict(EXPORT_LINKS_SQL, [int(group_id), last_id, links_per_page])
+            if not links:
+                break
+            link_ids = [link["id"] for link in links]
+            last_id = link_ids[-1]
+            _, rows = await conn.execute_query(EXPORT_HISTORY_SQL, [link_ids])
+            if rows:
+                yield rows
@@ -0,0 +1,70 @@
+"""Заполнение снимка истории в ProductLink по накопленным записям PriceHistory.
+
+Нужен один раз после миграции, добавившей поля prev_*, first_* и last_change:
+новые проверки обновляют их сами. С --compact история, записанная по строке
+на каждую проверку, сначала сжимается до строк с изменениями значения.
+Группы обрабатываются по одной, каждая в своём запросе, чтобы не держать
+длинную транзакцию на всей таблице.
+
+Запуск из корня репозитория:
+    python -m bot.tasks.backfill
+    python -m bot.tasks.backfill --group 12 --compact
+"""
+import argparse
+import asyncio
+import logging
+from typing import Optional
+
+from decouple import config
+from tortoise import Tortoise
+
+from bot.database.models.product_group import ProductGroup
+from bot.services.group import GroupService
+from bot.services.price_history import PriceHistoryService
+from core.configs.database import DbConfig, TORTOISE_ORM
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill(group_id: Optional[int] = None, compact: bool = False) -> int:
+    """Заполняет снимок истории у ссылок одной или всех групп. Возвращает количество ссылок."""
+    if group_id is not None:
+        group_ids = [group_id]
+    else:
+        group_ids = await ProductGroup.all().order_by("id").values_list("id", flat=True)
+
+    total = 0
+    for gid in group_ids:
+        if compact:
+            removed = await PriceHistoryService.compact_history(gid)
+            logger.info(f"Группа {gid}: удалено повторяющихся записей истории {removed}")
+        updated = await PriceHistoryService.backfill_snapshots(gid)
+        await GroupService.bump_data_version(gid)
+        logger.info(f"Группа {gid}: обновлено ссылок {updated}")
+        total += updated
+    return total
+
+
+async def run(group_id: Optional[int], compact: bool) -> None:
+    await Tortoise.init(
+        db_url=DbConfig.from_env(config).construct_tortoise_url(),
+        modules={"models": [m for m in TORTOISE_ORM["apps"]["models"]["models"] if m != "aerich.models"]},
+    )
+    try:
+        total = await backfill(group_id, compact)
+        logger.info(f"Снимок истории заполнен у {total} ссылок")
+    finally:
+        await Tortoise.close_connections()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--group", type=int, default=None, help="id группы; по умолчанию все группы")
+    parser.add_argument("--compact", action="store_true", help="слить повторяющиеся записи истории")
+    args = parser.parse_args()
+    asyncio.run(run(args.group, args.compact))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Запрос отклонён: сайт считается недоступным."""
+
+
+@dataclass
+class _HostCircuit:
+    state: str = CLOSED
+    outcomes: Deque[bool] = field(default_factory=deque)
+    opened_at: float = 0.0
+    probe_done: Optional[asyncio.Event] = None
+
+
+class CircuitBreaker:
+    """Предохранитель запросов к каждому хосту.
+
+    Если в окне из последних window запросов доля неудачных достигает
+    failure_rate, хост «размыкается»: запросы к нему сразу завершаются
+    CircuitOpenError. Через reset_timeout один пробный запрос проверяет
+    сайт, остальные ждут его результата: при успехе работа продолжается,
+    при неудаче хост снова размыкается.
+    """
+
+    def __init__(
+            self,
+            failure_rate: float = 0.5,
+            window: int = 20,
+            min_calls: int = 10,
+            reset_timeout: float = 60.0,
+    ):
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self._hosts: Dict[str, _HostCircuit] = {}
+
+    def _circuit(self, url: str) -> _HostCircuit:
+        host = urlsplit(url).hostname or url
+        if host not in self._hosts:
+            self._hosts[host] = _HostCircuit(outcomes=deque(maxlen=self.window))
+        return self._hosts[host]
+
+    def state(self, url: str) -> str:
+        """Текущее состояние предохранителя для хоста ссылки."""
+        return self._circuit(url).state
+
+    async def before_request(self, url: str) -> bool:
+        """Пропускает запрос или отклоняет его CircuitOpenError.
+
+        Возвращает True, если запрос является пробным.
+        """
+        circuit = self._circuit(url)
+        while True:
+            if circuit.state == CLOSED:
+                return False
+
+            if circuit.state == OPEN:
+                if time.monotonic() < circuit.opened_at + self.reset_timeout:
+                    raise CircuitOpenError(f"Сайт {urlsplit(url).hostname} недоступен")
+                circuit.state = HALF_OPEN
+                circuit.probe_done = asyncio.Event()
+                return True
+
+            # HALF_OPEN: ждём результата пробного запроса
+            await circuit.probe_done.wait()
+
+    def record(self, url: str, success: bool, probe: bool = False) -> None:
+        """Учитывает результат запроса к хосту.
+
+        probe — значение, которое вернул before_request. Из HALF_OPEN состояние меняет
+        только пробный запрос: ответы запросов, начатых до размыкания, игнорируются.
+        """
+        circuit = self._circuit(url)
+
+        if circuit.state == HALF_OPEN:
+            if not probe:
+                return
+            if success:
+                circuit.state = CLOSED
+                circuit.outcomes.clear()
+                logger.info(f"Сайт {urlsplit(url).hostname} снова доступен, парсинг продолжается")
+            else:
+                self._open(circuit, url)
+            circuit.probe_done.set()
+            return
+
+        if circuit.state == OPEN:
+            return
+
+        circuit.outcomes.append(success)
+        failures = circuit.outcomes.count(False)
+        if len(circuit.outcomes) >= self.min_calls and failures / len(circuit.outcomes) >= self.failure_rate:
+            self._open(circuit, url)
+
+    def _open(self, circuit: _HostCircuit, url: str) -> None:
+        circuit.state = OPEN
+        circuit.opened_at = time.monotonic()
+        logger.warning(
+            f"Сайт {urlsplit(url).hostname} недоступен, запросы приостановлены на {self.reset_timeout:.0f} с"
+        )
+
+    async def wait_available(self, url: str) -> None:
+        """Ждёт окончания паузы разомкнутого предохранителя, чтобы можно было отправить пробный запрос."""
+        circuit = self._circuit(url)
+        if circuit.state == OPEN:
+            delay = circuit.opened_at + self.reset_timeout - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
@@ -0,0 +1,120 @@
+import json
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, Optional, Set
+
+from tortoise import connections
+
+from bot.database.models.page_cache import PageCache
+
+logger = logging.getLogger(__name__)
+
+# Сколько загруженных страниц накапливается в памяти до записи в базу одним запросом
+STORE_BATCH_SIZE = 500
+
+# Запись пачки страниц: существующие записи по url перезаписываются
+UPSERT_PAGES_SQL = """
+INSERT INTO pagecache (url, etag, last_modified, data, fetched_at, used_at)
+SELECT url, etag, last_modified, data::jsonb, $5, $5
+FROM unnest($1::varchar[], $2::varchar[], $3::varchar[], $4::text[]) AS p(url, etag, last_modified, data)
+ON CONFLICT (url) DO UPDATE
+SET etag = EXCLUDED.etag,
+    last_modified = EXCLUDED.last_modified,
+    data = EXCLUDED.data,
+    fetched_at = EXCLUDED.fetched_at,
+    used_at = EXCLUDED.used_at
+RETURNING id, url
+"""
+
+
+class HttpCache:
+    """Персистентный кэш страниц для условных запросов.
+
+    Хранит по URL валидаторы ответа (ETag / Last-Modified) и уже извлечённые
+    поля товара. При ответе 304 парсер берёт данные из кэша без загрузки и
+    разбора страницы. Размер кэша ограничен количеством записей, возраст —
+    временем последней полной загрузки страницы.
+    Новые страницы копятся в памяти и записываются пачками по STORE_BATCH_SIZE,
+    остаток — в flush().
+    """
+
+    def __init__(self, max_entries: int = 50000, max_age_days: int = 30):
+        self.max_entries = max_entries
+        self.max_age = timedelta(days = max_age_days)
+        self._entries: Dict[str, PageCache] = {}
+        self._loaded: Set[str] = set()
+        self._used: Set[int] = set()
+        self._pending: Dict[str, PageCache] = {}
+
+    async def warm(self, urls: Iterable[str]) -> None:
+        """Загружает записи для списка ссылок одним запросом."""
+        urls = set(urls) - self._loaded
+        if not urls:
+            return
+        for entry in await PageCache.filter(url__in = list(urls)):
+            self._entries[entry.url] = entry
+        self._loaded |= urls
+
+    async def get(self, url: str) -> Optional[PageCache]:
+        """Возвращает запись кэша для ссылки, если она не устарела."""
+        if url not in self._loaded:
+            await self.warm([url])
+
+        entry = self._entries.get(url)
+        if entry and entry.fetched_at < datetime.now(timezone.utc) - self.max_age:
+            return None
+        return entry
+
+    def mark_used(self, entry: PageCache) -> None:
+        """Отмечает запись как использованную (ответ 304)."""
+        # У ещё не записанной страницы время использования и так текущее
+        if entry.id is not None:
+            self._used.add(entry.id)
+
+    async def store(self, url: str, etag: Optional[str], last_modified: Optional[str], data: dict) -> None:
+        """Сохраняет валидаторы и извлечённые данные страницы (запись в базу — пачкой)."""
+        now = datetime.now(timezone.utc)
+        entry = PageCache(
+            url = url, etag = etag, last_modified = last_modified, data = data, fetched_at = now, used_at = now,
+        )
+        self._entries[url] = entry
+        self._loaded.add(url)
+        self._pending[url] = entry
+        if len(self._pending) >= STORE_BATCH_SIZE:
+            await self._write_pending()
+
+    async def _write_pending(self) -> None:
+        # Пачка забирается до ожидания, чтобы параллельные store копили следующую
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        entries = list(pending.values())
+        _, rows = await connections.get("default").execute_query(UPSERT_PAGES_SQL, [
+            [entry.url for entry in entries],
+            [entry.etag for entry in entries],
+            [entry.last_modified for entry in entries],
+            [json.dumps(entry.data, ensure_ascii = False) for entry in entries],
+            datetime.now(timezone.utc),
+        ])
+        for row in rows:
+            pending[row["url"]].id = row["id"]
+
+    async def flush(self) -> None:
+        """Записывает накопленные страницы и время использования записей, отданных по 304."""
+        await self._write_pending()
+        if not self._used:
+            return
+        await PageCache.filter(id__in = list(self._used)).update(used_at = datetime.now(timezone.utc))
+        self._used.clear()
+
+    async def evict(self) -> int:
+        """Удаляет устаревшие записи и самые давно использованные сверх лимита."""
+        deleted = await PageCache.filter(fetched_at__lt = datetime.now(timezone.utc) - self.max_age).delete()
+
+        overflow = await PageCache.all().order_by("-used_at").offset(self.max_entries).values_list("id", flat = True)
+        if overflow:
+            deleted += await PageCache.filter(id__in = overflow).delete()
+
+        if deleted:
+            logger.info(f"Из кэша страниц удалено записей: {deleted}")
+        return deleted
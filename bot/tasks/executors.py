@@ -0,0 +1,26 @@
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def create_executor(kind: str, workers: int, name: str) -> Optional[Executor]:
+    """Создаёт пул для тяжёлой работы вне event loop.
+
+    kind: "process" — пул процессов, "thread" — пул потоков, "none" — работа в event loop.
+    name — префикс имён потоков пула и название пула в логах.
+
+    Процессы запускаются через spawn: fork из процесса с работающими потоками и event loop
+    может унаследовать захваченные ими блокировки и зависнуть. Задачи и их аргументы
+    передаются в процессы через pickle.
+    """
+    kind = kind.lower()
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+    if kind != "none":
+        logger.warning(f"Неизвестный тип пула '{kind}' для {name}, работа будет выполняться в event loop")
+    return None
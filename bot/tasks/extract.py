@@ -0,0 +1,153 @@
+import html
+import logging
+import re
+from concurrent.futures import Executor
+from typing import Dict, Optional
+
+from parsel import Selector
+
+from bot.tasks.executors import create_executor
+
+logger = logging.getLogger(__name__)
+
+TITLE_XPATH = "//h1[@data-qaid='product_name']/text()"
+PRICE_XPATH = "//div[@class='tqUsL']//div/@data-qaprice"
+COMPANY_XPATH = "//div[@class='l-GwW fvQVX']/a[@data-qaid='company_name']/text()"
+
+# Регулярные выражения, повторяющие XPath выше для потокового разбора
+TITLE_RE = re.compile(r"""<h1\b[^>]*\bdata-qaid=["']product_name["'][^>]*>([^<]*)<""")
+PRICE_CONTAINER_RE = re.compile(r"""<div\b[^>]*\bclass=["']tqUsL["']""")
+PRICE_RE = re.compile(r"""<div\b[^>]*\bdata-qaprice=["']([^"']*)["']""")
+COMPANY_CONTAINER_RE = re.compile(r"""<div\b[^>]*\bclass=["']l-GwW fvQVX["']""")
+COMPANY_RE = re.compile(r"""<a\b[^>]*\bdata-qaid=["']company_name["'][^>]*>([^<]*)<""")
+# Открывающие и закрывающие теги div: по ним находится конец блока-контейнера
+DIV_TAG_RE = re.compile(r"<div[\s>]|</div\s*>")
+
+# Запас при повторном поиске, чтобы не потерять тег, разрезанный границей чанка
+OVERLAP = 4096
+
+
+def extract(selector: Selector, xpath: str, default: str = "") -> str:
+    """Безопасное извлечение данных по XPath."""
+    try:
+        value = selector.xpath(xpath).get()
+        return value.strip() if value else default
+    except Exception as e:
+        logger.warning(f"Ошибка XPath '{xpath}': {e}")
+        return default
+
+
+def extract_product(text: str) -> Dict[str, str]:
+    """Извлечение полей товара через полный DOM страницы."""
+    selector = Selector(text)
+    return {
+        "title": extract(selector, TITLE_XPATH),
+        "price": extract(selector, PRICE_XPATH),
+        "company": extract(selector, COMPANY_XPATH),
+    }
+
+
+def extract_product_from_bytes(body: bytes, encoding: str = "utf-8") -> Dict[str, str]:
+    """Извлечение полей товара из сырого тела ответа.
+
+    Функция уровня модуля, чтобы её можно было передать в пул процессов.
+    """
+    return extract_product(body.decode(encoding, errors="replace"))
+
+
+def create_parse_executor(kind: str, workers: int) -> Optional[Executor]:
+    """Создаёт пул для разбора страниц вне event loop.
+
+    kind: "process" — пул процессов, "thread" — пул потоков, "none" — разбор в event loop.
+    """
+    return create_executor(kind, workers, "parse")
+
+
+class ContainerSearch:
+    """Потоковый поиск значения внутри блока div.
+
+    Значение ищется только между открывающим и закрывающим тегом блока: вложенность
+    div отслеживается по уже полученному тексту. Если блок закрылся без значения,
+    поиск продолжается в следующем таком блоке, как у XPath по всем блокам страницы.
+    """
+
+    def __init__(self, container: re.Pattern, value: re.Pattern):
+        self.container = container
+        self.value = value
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._depth = 0
+        self._tags_from = 0
+        self._next_from = 0
+
+    def search(self, buffer: str, start: int) -> Optional[str]:
+        """Ищет значение в тексте начиная с start. Возвращает его или None, если пока не найдено."""
+        while True:
+            if self._start is None:
+                match = self.container.search(buffer, max(start, self._next_from))
+                if not match:
+                    return None
+                self._start = self._tags_from = match.end()
+                self._end = None
+                self._depth = 1
+
+            if self._end is None:
+                # Разбираются только полностью полученные теги, незаконченный разберётся в следующей части
+                for tag in DIV_TAG_RE.finditer(buffer, self._tags_from):
+                    self._depth += -1 if tag.group().startswith("</") else 1
+                    self._tags_from = tag.end()
+                    if not self._depth:
+                        self._end = tag.start()
+                        break
+
+            end = self._end if self._end is not None else len(buffer)
+            match = self.value.search(buffer, max(start, self._start), end)
+            if match:
+                value = html.unescape(match.group(1)).strip()
+                if value:
+                    return value
+            if self._end is None:
+                return None
+            # Блок закрылся без значения: ищем следующий
+            self._next_from = self._tags_from
+            self._start = None
+
+
+class StreamingProductExtractor:
+    """Потоковое извлечение полей товара.
+
+    Принимает страницу частями и ищет поля регулярными выражениями по уже
+    полученному тексту, не строя DOM. Как только найдены все поля, загрузку
+    страницы можно прекратить.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, str] = {}
+        self._scanned = 0
+        self._price = ContainerSearch(PRICE_CONTAINER_RE, PRICE_RE)
+        self._company = ContainerSearch(COMPANY_CONTAINER_RE, COMPANY_RE)
+
+    @property
+    def complete(self) -> bool:
+        return len(self.fields) == 3
+
+    def feed(self, chunk: str) -> bool:
+        """Добавляет часть страницы. Возвращает True, когда все поля найдены."""
+        self.buffer += chunk
+        start = max(0, self._scanned - OVERLAP)
+        self._scanned = len(self.buffer)
+
+        if "title" not in self.fields:
+            match = TITLE_RE.search(self.buffer, start)
+            value = html.unescape(match.group(1)).strip() if match else ""
+            if value:
+                self.fields["title"] = value
+
+        for name, search in (("price", self._price), ("company", self._company)):
+            if name not in self.fields:
+                value = search.search(self.buffer, start)
+                if value:
+                    self.fields[name] = value
+
+        return self.complete
@@ -0,0 +1,70 @@
+import logging
+from typing import Optional
+
+import aiohttp
+
+from bot.tasks.breaker import CircuitBreaker
+from bot.tasks.limiter import AdaptiveRateLimiter
+from core.configs.parser import ParserConfig
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/121.0.0.0 Safari/537.36"
+
+
+class HttpClient:
+    """Общий HTTP-клиент приложения для всех задач парсинга.
+
+    Держит одну сессию aiohttp с пулом keep-alive соединений и кэшем DNS,
+    поэтому запуски по расписанию и принудительные запуски не платят за новые
+    TCP/TLS-рукопожатия. Ограничитель скорости и предохранитель тоже общие:
+    параллельные запуски видят одно и то же состояние сайта.
+    Открывается и закрывается вместе с ботом в bot.main.main.
+    """
+
+    def __init__(self, parser_config: ParserConfig):
+        self.config = parser_config
+        self.limiter = AdaptiveRateLimiter(
+            initial_rate=parser_config.rate_initial,
+            min_rate=parser_config.rate_min,
+            max_rate=parser_config.rate_max,
+        )
+        self.breaker = CircuitBreaker(
+            failure_rate=parser_config.breaker_failure_rate,
+            window=parser_config.breaker_window,
+            min_calls=parser_config.breaker_min_calls,
+            reset_timeout=parser_config.breaker_reset_timeout,
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def start(self) -> aiohttp.ClientSession:
+        """Создаёт сессию, если она ещё не открыта. Вызывается внутри работающего event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.connection_limit,
+                limit_per_host=self.config.per_host_limit,
+                use_dns_cache=True,
+                ttl_dns_cache=self.config.dns_cache_ttl,
+                keepalive_timeout=self.config.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    "User-Agent": USER_AGENT,
+                    "Accept-Encoding": "gzip, deflate",
+                },
+                auto_decompress=True,
+            )
+            logger.info("HTTP-клиент парсера запущен")
+        return self._session
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self.start()
+
+    async def close(self) -> None:
+        """Закрывает сессию и все соединения пула."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP-клиент парсера остановлен")
+        self._session = None
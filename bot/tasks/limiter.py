@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Статусы, означающие перегрузку сайта
+OVERLOAD_STATUSES = {429, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбор заголовка Retry-After: число секунд или HTTP-дата."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class _HostState:
+    rate: float
+    next_slot: float = 0.0
+    blocked_until: float = 0.0
+    last_decrease: float = 0.0
+    latency: Optional[float] = None
+
+
+class AdaptiveRateLimiter:
+    """Адаптивный ограничитель частоты запросов к каждому хосту (AIMD).
+
+    Пока ответы успешные и быстрые, скорость растёт примерно на increase
+    запросов в секунду за секунду. При 429/5xx, таймаутах или всплеске
+    задержки скорость умножается на decrease (не чаще раза в секунду).
+    Retry-After блокирует хост на указанное время.
+    """
+
+    DECREASE_COOLDOWN = 1.0  # seconds
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(
+            self,
+            initial_rate: float = 5.0,
+            min_rate: float = 0.5,
+            max_rate: float = 20.0,
+            increase: float = 1.0,
+            decrease: float = 0.5,
+            latency_factor: float = 3.0,
+    ):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, url: str) -> _HostState:
+        host = urlsplit(url).hostname or url
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(rate=self.initial_rate)
+        return self._hosts[host]
+
+    async def acquire(self, url: str) -> None:
+        """Ожидает очередной разрешённый слот для запроса к хосту ссылки."""
+        state = self._state(url)
+        now = time.monotonic()
+        slot = max(now, state.next_slot, state.blocked_until)
+        state.next_slot = slot + 1 / state.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def record(
+            self,
+            url: str,
+            status: Optional[int],
+            latency: Optional[float] = None,
+            retry_after: Optional[str] = None,
+    ) -> None:
+        """Учитывает результат запроса. status=None означает таймаут или сетевую ошибку."""
+        state = self._state(url)
+        now = time.monotonic()
+
+        delay = parse_retry_after(retry_after)
+        if delay:
+            state.blocked_until = max(state.blocked_until, now + delay)
+
+        spike = (
+            latency is not None
+            and state.latency is not None
+            and latency > state.latency * self.latency_factor
+        )
+        if latency is not None:
+            state.latency = latency if state.latency is None else (
+                    state.latency + self.LATENCY_SMOOTHING * (latency - state.latency)
+            )
+
+        if status is None or status in OVERLOAD_STATUSES or status >= 500 or spike:
+            if now - state.last_decrease >= self.DECREASE_COOLDOWN:
+                state.rate = max(self.min_rate, state.rate * self.decrease)
+                state.last_decrease = now
+                logger.info(f"Скорость запросов снижена до {state.rate:.2f} запр/с (статус {status})")
+        elif status < 400:
+            state.rate = min(self.max_rate, state.rate + self.increase / state.rate)
+
+    def current_rate(self, url: str) -> float:
+        """Текущая разрешённая скорость запросов к хосту ссылки, запр/с."""
+        return self._state(url).rate
+
+    def rates(self) -> Dict[str, float]:
+        """Текущие скорости по всем хостам."""
+        return {host: state.rate for host, state in self._hosts.items()}
@@ -0,0 +1,222 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Tuple
+
+from tortoise import connections
+from tortoise.transactions import in_transaction
+
+from core.config import load_config
+
+logger = logging.getLogger(__name__)
+config = load_config()
+
+# Сколько месячных секций истории создаётся заранее, вперёд от текущего месяца
+PARTITIONS_AHEAD = 2
+
+ROLLUP_PERIODS = ("day", "week")
+
+# Сводка истории по периодам ($1 — 'day' или 'week') для всех периодов, пересекающих [$2, $3).
+# Запись с интервалом действия (date .. valid_to) учитывается в каждом периоде, который она покрывает,
+# поэтому пересчёт затронутых периодов всегда полный и его можно повторять.
+# Записи, начавшиеся в диапазоне, отбираются условием на date прямо по параметрам: секции вне
+# диапазона отсекаются при старте запроса. Действующая на начало диапазона запись у ссылки может быть
+# только последней до его начала — она находится по индексу (product_link_id, date DESC).
+ROLLUP_SQL = """
+WITH bounds AS (
+    SELECT date_trunc($1, $2::timestamptz) AS lo,
+           date_trunc($1, $3::timestamptz - INTERVAL '1 microsecond') + ('1 ' || $1)::interval AS hi
+),
+history AS (
+    SELECT h.id, h.product_link_id, h.price, h.views, h.date, h.valid_to
+    FROM pricehistory h
+    WHERE h.date >= date_trunc($1, $2::timestamptz)
+      AND h.date < date_trunc($1, $3::timestamptz - INTERVAL '1 microsecond') + ('1 ' || $1)::interval
+    UNION ALL
+    SELECT o.id, l.id, o.price, o.views, o.date, o.valid_to
+    FROM bounds b
+    CROSS JOIN productlink l
+    JOIN LATERAL (
+        SELECT id, price, views, date, valid_to FROM pricehistory
+        WHERE product_link_id = l.id AND date < b.lo
+        ORDER BY date DESC LIMIT 1
+    ) o ON COALESCE(o.valid_to, o.date) >= b.lo
+)
+INSERT INTO pricehistoryrollup (
+    product_link_id, period, period_start,
+    min_price, max_price, last_price, min_views, max_views, last_views, count
+)
+SELECT h.product_link_id,
+       $1,
+       p.period_start,
+       min(h.price),
+       max(h.price),
+       (array_agg(h.price ORDER BY h.date DESC, h.id DESC))[1],
+       min(h.views),
+       max(h.views),
+       (array_agg(h.views ORDER BY h.date DESC, h.id DESC))[1],
+       count(*)
+FROM bounds b
+CROSS JOIN history h
+CROSS JOIN LATERAL generate_series(
+    greatest(date_trunc($1, h.date), b.lo),
+    least(date_trunc($1, COALESCE(h.valid_to, h.date)), b.hi - ('1 ' || $1)::interval),
+    ('1 ' || $1)::interval
+) AS p(period_start)
+GROUP BY h.product_link_id, p.period_start
+ON CONFLICT (product_link_id, period, period_start) DO UPDATE
+SET min_price = EXCLUDED.min_price,
+    max_price = EXCLUDED.max_price,
+    last_price = EXCLUDED.last_price,
+    min_views = EXCLUDED.min_views,
+    max_views = EXCLUDED.max_views,
+    last_views = EXCLUDED.last_views,
+    count = EXCLUDED.count
+"""
+
+IS_PARTITIONED_SQL = """
+SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'pricehistory'::regclass
+"""
+
+PARTITIONS_SQL = """
+SELECT c.relname AS name
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'pricehistory'::regclass AND c.relname LIKE 'pricehistory\\_p%'
+ORDER BY c.relname
+"""
+
+PARTITION_EXISTS_SQL = """
+SELECT to_regclass($1) IS NOT NULL AS exists
+"""
+
+# Записи месяца [$1, $2), попавшие в секцию по умолчанию, пока месячной секции не было,
+# переносятся в новую секцию одним запросом. Границы приводятся к timestamptz так же, как границы секций.
+MOVE_FROM_DEFAULT_SQL = """
+WITH moved AS (
+    DELETE FROM "pricehistory_default"
+    WHERE date >= $1::date::timestamptz AND date < $2::date::timestamptz
+    RETURNING *
+), inserted AS (
+    INSERT INTO "{partition}" SELECT * FROM moved RETURNING 1
+)
+SELECT count(*) AS moved FROM inserted
+"""
+
+# Граница секции ($1 — дата) приводится к timestamptz так же, как границы при создании секций.
+# Записи удаляемой секции, которые ещё действуют после её конца, переносятся в следующую секцию:
+# начало их интервала сдвигается на границу хранения, значение и число проверок сохраняются
+CARRY_OVER_SQL = """
+INSERT INTO pricehistory (price, views, date, valid_to, checks, product_link_id)
+SELECT price, views, $1::date::timestamptz, valid_to, checks, product_link_id
+FROM "{partition}"
+WHERE valid_to >= $1::date::timestamptz
+"""
+
+
+def _month_start(day: date, months: int = 0) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"pricehistory_p{month.year:04d}_{month.month:02d}"
+
+
+def _partition_month(name: str) -> date:
+    year, month = name.removeprefix("pricehistory_p").split("_")
+    return date(int(year), int(month), 1)
+
+
+async def _is_partitioned() -> bool:
+    rows = await connections.get("default").execute_query_dict(IS_PARTITIONED_SQL)
+    return bool(rows)
+
+
+async def ensure_partitions(today: date) -> None:
+    """Создаёт месячные секции истории на текущий месяц и PARTITIONS_AHEAD месяцев вперёд.
+
+    Секцию нельзя создать, пока в секции по умолчанию лежат записи её месяца. Поэтому
+    секция создаётся отдельной таблицей, записи месяца переносятся в неё из секции
+    по умолчанию, и таблица подключается к pricehistory — всё в одной транзакции.
+    Ошибка с одним месяцем пишется в лог и не мешает остальным.
+    """
+    for offset in range(PARTITIONS_AHEAD + 1):
+        month = _month_start(today, offset)
+        name = _partition_name(month)
+        try:
+            await _create_partition(name, month, _month_start(month, 1))
+        except Exception as e:
+            logger.error(f"Не удалось создать секцию истории цен {name}: {e}")
+
+
+async def _create_partition(name: str, start: date, end: date) -> None:
+    rows = await connections.get("default").execute_query_dict(PARTITION_EXISTS_SQL, [name])
+    if rows[0]["exists"]:
+        return
+
+    async with in_transaction() as conn:
+        await conn.execute_script(
+            f'CREATE TABLE "{name}" (LIKE "pricehistory" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        rows = await conn.execute_query_dict(MOVE_FROM_DEFAULT_SQL.format(partition=name), [start, end])
+        await conn.execute_script(
+            f'ALTER TABLE "pricehistory" ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    moved = rows[0]["moved"]
+    if moved:
+        logger.info(f"Создана секция истории цен {name}, из секции по умолчанию перенесено записей: {moved}")
+
+
+async def refresh_rollups(start: datetime, end: datetime) -> None:
+    """Пересчитывает дневные и недельные сводки за периоды, пересекающие [start, end)."""
+    conn = connections.get("default")
+    for period in ROLLUP_PERIODS:
+        await conn.execute_query(ROLLUP_SQL, [period, start, end])
+
+
+async def apply_retention(today: date, months: int) -> List[str]:
+    """Удаляет месячные секции истории старше months месяцев. Возвращает имена удалённых секций."""
+    cutoff = _month_start(today, -months)
+    rows = await connections.get("default").execute_query_dict(PARTITIONS_SQL)
+    expired: List[Tuple[str, date]] = [
+        (row["name"], _partition_month(row["name"]))
+        for row in rows
+        if _partition_month(row["name"]) < cutoff
+    ]
+
+    dropped = []
+    for name, month in expired:
+        start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+        end_month = _month_start(month, 1)
+        end = datetime(end_month.year, end_month.month, 1, tzinfo=timezone.utc)
+
+        # Сводки за период секции должны быть готовы до удаления подробных записей
+        await refresh_rollups(start, end)
+        async with in_transaction() as conn:
+            await conn.execute_query(CARRY_OVER_SQL.format(partition=name), [end_month])
+            await conn.execute_script(f'DROP TABLE "{name}"')
+        dropped.append(name)
+        logger.info(f"Удалена секция истории цен {name}")
+    return dropped
+
+
+async def maintain_price_history():
+    """Ежедневное обслуживание истории цен: секции, сводки и срок хранения."""
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    partitioned = await _is_partitioned()
+
+    if partitioned:
+        await ensure_partitions(today)
+    else:
+        logger.warning("Таблица pricehistory не секционирована, секции и срок хранения пропущены")
+
+    # Неделя с запасом: недельная сводка текущей недели пересчитывается полностью
+    await refresh_rollups(now - timedelta(days=8), now + timedelta(days=1))
+
+    months = config.parser.history_retention_months
+    if partitioned and months > 0:
+        await apply_retention(today, months)
+
+    logger.info("Обслуживание истории цен завершено")
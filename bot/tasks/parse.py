@@ -1,9 +1,13 @@
 import asyncio
+import codecs
 import io
 import logging
 import re
+from concurrent.futures import Executor
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Optional, Union
+from typing import AsyncIterator, List, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -11,24 +15,33 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 import aiohttp
-import pandas as pd
 from aiogram import Bot
 from aiogram.types import BufferedInputFile
-from openpyxl.styles import Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from parsel import Selector
 from tortoise.transactions import in_transaction
 
 from bot.database.models.price_history import PriceHistory
 from bot.database.models.product_group import ProductGroup
+from bot.database.models.product_link import SNAPSHOT_FIELDS
+from bot.services.group import GroupService
+from bot.services.price_history import PriceHistoryService
+from bot.tasks.breaker import CircuitBreaker, CircuitOpenError
+from bot.tasks.cache import HttpCache
+from bot.tasks.extract import StreamingProductExtractor, create_parse_executor, extract_product_from_bytes
+from bot.tasks.http import HttpClient
+from bot.tasks.limiter import AdaptiveRateLimiter
+from bot.tasks.reports import report_queue
+from bot.tasks.writer import BatchWriter
 from core.config import load_config
 
 logger = logging.getLogger(__name__)
 config = load_config()
 bot = Bot(token=config.tg_bot.token)
+http_client = HttpClient(config.parser)
 
 import time
 
+PROGRESS_UPDATE_INTERVAL = 2  # seconds
+
 
 def format_progress(start_time: float, current: int, total: int) -> str:
     # Проценты
@@ -58,202 +71,398 @@ def format_progress(start_time: float, current: int, total: int) -> str:
     )
 
 
+@dataclass
+class FetchResult:
+    """Результат запроса страницы."""
+
+    status: int
+    body: bytes = b""
+    encoding: str = "utf-8"
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fields: Optional[Dict[str, str]] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
 class ProductParser:
     MAX_RETRIES = 3
     REQUEST_DELAY = 0.1  # seconds
-
-    def __init__(self, session: aiohttp.ClientSession):
+    CHUNK_SIZE = 16 * 1024  # bytes
+    # Остаток страницы после найденных полей дочитывается без разбора, чтобы соединение
+    # вернулось в пул keep-alive. Более длинный остаток дешевле оборвать вместе с соединением
+    DRAIN_LIMIT = 1024 * 1024  # bytes
+
+    def __init__(
+            self,
+            session: aiohttp.ClientSession,
+            concurrency: int = 10,
+            per_host_limit: int = 5,
+            dedupe: bool = False,
+            cache: Optional[HttpCache] = None,
+            streaming: bool = False,
+            executor: Optional[Executor] = None,
+            limiter: Optional[AdaptiveRateLimiter] = None,
+            breaker: Optional[CircuitBreaker] = None,
+    ):
         self.session = session
-
-    async def fetch(self, url: str) -> Optional[str]:
+        self.limiter = limiter
+        self.breaker = breaker
+        self.cache = cache
+        self.streaming = streaming
+        self.executor = executor
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.dedupe = dedupe
+        self.deduplicated = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._results: Dict[str, asyncio.Future] = {}
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Семафор, ограничивающий число одновременных запросов к хосту ссылки."""
+        host = urlsplit(url).hostname or ""
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[FetchResult]:
         """Асинхронный запрос с повторными попытками и обработкой ошибок."""
         for attempt in range(self.MAX_RETRIES):
+            # При разомкнутом предохранителе запрос сразу завершается CircuitOpenError
+            probe = await self.breaker.before_request(url) if self.breaker else False
+            healthy = None
             try:
-                async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    response.raise_for_status()
-                    return await response.text()
+                # Пауза ограничителя выдерживается до захвата семафоров, слот занимает только сам запрос
+                if self.limiter:
+                    await self.limiter.acquire(url)
+                async with self._semaphore, self._host_semaphore(url):
+                    started = time.monotonic()
+                    try:
+                        async with self.session.get(
+                                url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)
+                        ) as response:
+                            healthy = response.status < 500 and response.status != 429
+                            if self.limiter:
+                                self.limiter.record(
+                                    url,
+                                    response.status,
+                                    time.monotonic() - started,
+                                    response.headers.get("Retry-After"),
+                                )
+                            response.raise_for_status()
+                            if response.status == 304:
+                                return FetchResult(status=304)
+                            if self.streaming:
+                                return await self._read_streaming(response)
+                            body = await response.read()
+                            return FetchResult(
+                                status=response.status,
+                                body=body,
+                                encoding=response.get_encoding(),
+                                etag=response.headers.get("ETag"),
+                                last_modified=response.headers.get("Last-Modified"),
+                            )
+                    except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                        healthy = False
+                        if self.limiter:
+                            self.limiter.record(url, None, time.monotonic() - started)
+                        raise
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 logger.warning(f"[{url}] Попытка {attempt + 1} не удалась: {e}")
                 if attempt < self.MAX_RETRIES - 1:
                     await asyncio.sleep(self.REQUEST_DELAY * (attempt + 1))
+            finally:
+                if self.breaker and (healthy is not None or probe):
+                    self.breaker.record(url, bool(healthy), probe=probe)
         logger.error(f"[{url}] Не удалось получить страницу после {self.MAX_RETRIES} попыток")
         return None
 
-    @staticmethod
-    def extract(selector: Selector, xpath: str, default: str = "") -> str:
-        """Безопасное извлечение данных по XPath."""
+    async def _read_streaming(self, response: aiohttp.ClientResponse) -> FetchResult:
+        """Читает страницу частями и прекращает разбор, как только найдены все поля товара."""
+        charset = response.charset or "utf-8"
         try:
-            value = selector.xpath(xpath).get()
-            return value.strip() if value else default
-        except Exception as e:
-            logger.warning(f"Ошибка XPath '{xpath}': {e}")
-            return default
+            decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+        except LookupError:
+            charset = "utf-8"
+            decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+
+        body = bytearray()
+        extractor = StreamingProductExtractor()
+        async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+            body += chunk
+            if extractor.feed(decoder.decode(chunk)):
+                break
+        else:
+            extractor.feed(decoder.decode(b"", final=True))
+
+        if extractor.complete:
+            try:
+                await self._drain(response, len(body))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Поля уже найдены: ошибка при дочитывании стоит только соединения, не результата
+                logger.debug(f"[{response.url}] Не удалось дочитать страницу: {e}")
+                response.close()
+
+        return FetchResult(
+            status=response.status,
+            body=bytes(body),
+            encoding=charset,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fields=extractor.fields if extractor.complete else None,
+        )
+
+    async def _drain(self, response: aiohttp.ClientResponse, received: int) -> None:
+        """Дочитывает остаток тела не больше DRAIN_LIMIT байт, чтобы сохранить соединение."""
+        if response.content.at_eof():
+            return
+        if response.content_length is not None and response.content_length - received > self.DRAIN_LIMIT:
+            return
+        drained = 0
+        async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+            drained += len(chunk)
+            if drained > self.DRAIN_LIMIT:
+                return
+
+    async def _extract(self, page: FetchResult) -> Dict[str, str]:
+        """Разбор страницы через DOM, в пуле исполнителя, если он задан, чтобы не блокировать event loop."""
+        if self.executor is None:
+            return extract_product_from_bytes(page.body, page.encoding)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, extract_product_from_bytes, page.body, page.encoding)
 
     async def parse_product(self, url: str) -> Optional[Dict[str, Union[str, float]]]:
-        """Парсинг страницы продукта."""
-        html = await self.fetch(url)
-        if not html:
+        """Парсинг страницы продукта.
+
+        При dedupe=True каждая ссылка запрашивается один раз за время жизни парсера,
+        а результат отдаётся всем группам, в которых она встречается.
+        """
+        if not self.dedupe:
+            return await self._parse_product(url)
+
+        if url in self._results:
+            self.deduplicated += 1
+        else:
+            self._results[url] = asyncio.ensure_future(self._parse_product(url))
+        future = self._results[url]
+        try:
+            # shield: отмена обработки одной группы не должна отменять общий запрос
+            return await asyncio.shield(future)
+        except CircuitOpenError:
+            # Пропущенная из-за недоступности сайта ссылка должна запрашиваться заново
+            if self._results.get(url) is future:
+                del self._results[url]
+            raise
+
+    async def _parse_product(self, url: str) -> Optional[Dict[str, Union[str, float]]]:
+        # Условный запрос: если страница не изменилась, берём данные из кэша
+        entry = await self.cache.get(url) if self.cache else None
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        page = await self.fetch(url, headers=headers or None)
+        if not page:
             return None
 
-        selector = Selector(html)
-        return {
-            "link": url,
-            "title": self.extract(selector, "//h1[@data-qaid='product_name']/text()"),
-            "price": self.extract(selector, "//div[@class='tqUsL']//div/@data-qaprice"),
-            "company": self.extract(selector, "//div[@class='l-GwW fvQVX']/a[@data-qaid='company_name']/text()"),
-        }
+        if page.not_modified and entry:
+            self.cache.mark_used(entry)
+            return dict(entry.data, link=url)
+
+        if not page.body:
+            return None
+
+        # Полный DOM строится, только если потоковое извлечение не нашло все поля
+        product = {"link": url, **(page.fields or await self._extract(page))}
+
+        # Страница без названия или цены (заглушка, капча, сменившаяся вёрстка) не кэшируется,
+        # иначе ответ 304 отдавал бы пустой результат до устаревания записи
+        if self.cache and (page.etag or page.last_modified) and product.get("title") and product.get("price"):
+            try:
+                await self.cache.store(url, page.etag, page.last_modified, product)
+            except Exception as e:
+                logger.warning(f"[{url}] Не удалось сохранить страницу в кэш: {e}")
+        return product
+
+    async def parse_many(
+            self, urls: List[str], skipped: Optional[List[int]] = None
+    ) -> AsyncIterator[Tuple[int, Optional[Dict[str, Union[str, float]]]]]:
+        """Конкурентный парсинг списка ссылок.
+
+        Отдаёт пары (индекс ссылки, результат) по мере готовности, поэтому медленная
+        или упавшая ссылка не задерживает остальные. Одновременно в работе не больше
+        concurrency ссылок, так что несколько групп, разделяющих один парсер,
+        получают общий бюджет запросов поровну.
+
+        Индексы ссылок, пропущенных из-за недоступности сайта, добавляются в skipped
+        и не отдаются.
+        """
+
+        async def run(idx: int, url: str):
+            try:
+                return idx, await self.parse_product(url)
+            except CircuitOpenError:
+                return idx, CircuitOpenError
+            except Exception as e:
+                logger.error(f"[{url}] Ошибка парсинга: {e}")
+                return idx, None
+
+        queue = iter(enumerate(urls))
+        pending = set()
+        try:
+            while True:
+                for idx, url in queue:
+                    pending.add(asyncio.create_task(run(idx, url)))
+                    if len(pending) >= self.concurrency:
+                        break
+                if not pending:
+                    return
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    idx, product = task.result()
+                    if product is CircuitOpenError:
+                        if skipped is not None:
+                            skipped.append(idx)
+                        continue
+                    yield idx, product
+        finally:
+            for task in pending:
+                task.cancel()
 
 
 async def generate_excel(data: List[Dict]) -> io.BytesIO:
     """Генерация Excel-файла из списка словарей."""
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-        workbook = writer.book
-        worksheet = writer.sheets['Sheet1']
-
-        # Автоподгонка ширины столбцов и настройка высоты строк
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            contains_company_name = False
-            contains_product_name = False
-            contains_url_to_product_name = False
-            contains_date_name = False
-            contains_price_name = False
-
-            # Проверяем ячейки столбца
-            for cell in column:
-                try:
-                    if cell.value is not None:
-                        text = str(cell.value)
-                        # Проверяем наличие "Название компании"
-                        if "Название компании" in text:
-                            contains_company_name = True
-                        elif 'Название продукта' in text or 'Название товара' in text:
-                            contains_product_name = True
-                        elif 'Ссылка на товар' in text or 'Ссылка' in text:
-                            contains_url_to_product_name = True
-                        elif 'Дата последней проверки' in text:
-                            contains_date_name = True
-                        elif 'Стоимость' in text:
-                            contains_price_name = True
-
-                        # Рассчитываем длину для автоподгонки
-                        line_lengths = [len(line) for line in text.split('\n')]
-                        cell_max_length = max(line_lengths, default=0)
-                        max_length = max(max_length, cell_max_length)
-
-                        cell.alignment = Alignment(wrap_text=True)
-                        cell.border = thin_border
-                except:
-                    pass
-
-            # Устанавливаем ширину столбца
-            if contains_company_name:
-                adjusted_width = 23
-            elif contains_product_name:
-                adjusted_width = 50
-            elif contains_url_to_product_name:
-                adjusted_width = 50
-            elif contains_date_name:
-                adjusted_width = 15
-            elif contains_price_name:
-                adjusted_width = 15
-            else:
-                adjusted_width = min((max_length + 2) * 1.1, 50)  # Автоподгонка для остальных
-            worksheet.column_dimensions[column_letter].width = adjusted_width
-
-    output.seek(0)
-    return output
+    return await report_queue.render(data)
 
 
 async def process_group(group: ProductGroup, parser: ProductParser, with_stop_button: bool = False):
     """Парсинг ссылок группы, обновление базы и отправка Excel пользователю."""
     logger.info(f"Обрабатываю группу '{group.title}' (id={group.id})")
-    data = []
-    total_links = len(group.product_links)
+    links = list(group.product_links)
+    rows: Dict[int, Dict] = {}
+    total_links = len(links)
     parsed_links = 0
+    done = 0
+    msg = None
     last_text = None
+    last_update = 0.0
     start_time = time.time()
 
-    async with in_transaction() as conn:
-        for idx, link in enumerate(group.product_links, start=1):
-            product = await parser.parse_product(link.url)
-            if not product:
-                logger.warning(f"Не удалось спарсить {link.url}")
-                continue
-
-            # Обновление полей
-            link.productName = product.get("title") or link.productName
-            link.companyName = product.get("company") or link.companyName
-
-            # Обработка цены
-            raw_price = product.get("price")
-
-            try:
-                price_value = float("".join(ch for ch in raw_price if ch.isdigit() or ch == ".")) if raw_price else 0.0
-            except ValueError:
-                price_value = 0.0
-
-            link.last_price = price_value
-            link.last_check = datetime.now(timezone.utc)
-            await link.save(using_db=conn)
-
-            await PriceHistory.create(
-                product_link=link,
-                price=int(price_value),
-                date=datetime.now(timezone.utc),
-                using_db=conn
-            )
+    # Индексы ссылок, которые ещё предстоит запросить
+    pending = list(range(total_links))
+
+    # Результаты пишутся в базу пачками в коротких транзакциях фоновой задачей писателя,
+    # так что соединение с базой не удерживается на время сетевых запросов
+    async with BatchWriter(
+            fields=("productName", "companyName", *SNAPSHOT_FIELDS),
+            batch_size=config.parser.db_batch_size,
+            flush_interval=config.parser.db_flush_interval,
+            change_only=config.parser.history_mode == "change",
+            group_id=group.id,
+    ) as writer:
+        for retry_pass in range(config.parser.retry_passes + 1):
+            if retry_pass:
+                # Ссылки, пропущенные во время недоступности сайта, запрашиваются повторно после паузы
+                logger.info(
+                    f"Повторный проход {retry_pass} по группе '{group.title}': {len(pending)} пропущенных ссылок"
+                )
+                await parser.breaker.wait_available(links[pending[0]].url)
+
+            skipped: List[int] = []
+            # Ссылки запрашиваются конкурентно, результаты приходят по мере готовности
+            async for pos, product in parser.parse_many([links[idx].url for idx in pending], skipped=skipped):
+                idx = pending[pos]
+                done += 1
+                link = links[idx]
+
+                if not product:
+                    logger.warning(f"Не удалось спарсить {link.url}")
+                else:
+                    # Обновление полей
+                    link.productName = product.get("title") or link.productName
+                    link.companyName = product.get("company") or link.companyName
+
+                    # Обработка цены
+                    raw_price = product.get("price")
+
+                    try:
+                        price_value = float(
+                            "".join(ch for ch in raw_price if ch.isdigit() or ch == ".")
+                        ) if raw_price else 0.0
+                    except ValueError:
+                        price_value = 0.0
+
+                    changed = link.record_check(datetime.now(timezone.utc), price=price_value)
+                    await writer.add(
+                        link,
+                        PriceHistory(
+                            product_link=link,
+                            price=int(price_value),
+                            date=link.last_check,
+                        ),
+                        changed,
+                    )
+
+                    rows[idx] = {
+                        "Дата последней проверки": link.last_check.strftime("%d.%m.%Y"),
+                        "Название товара": link.productName,
+                        "Название компании": link.companyName,
+                        "Стоимость": link.last_price,
+                        "Ссылка": link.url,
+                    }
+                    parsed_links += 1
 
-            data.append(
-                {
-                    "Дата последней проверки": link.last_check.strftime("%d.%m.%Y"),
-                    "Название товара": link.productName,
-                    "Название компании": link.companyName,
-                    "Стоимость": link.last_price,
-                    "Ссылка": link.url,
-                }
-            )
-            parsed_links += 1
+                # Прогресс обновляется не чаще PROGRESS_UPDATE_INTERVAL, чтобы не упираться в лимиты Telegram
+                if done != total_links and time.time() - last_update < PROGRESS_UPDATE_INTERVAL:
+                    continue
+                last_update = time.time()
 
-            progress_bar = format_progress(start_time, idx, total_links)
-            new_text = f"Прогресс парсинга группы: {group.title}\n{progress_bar}"
+                progress_bar = format_progress(start_time, done, total_links)
+                new_text = f"Прогресс парсинга группы: {group.title}\n{progress_bar}"
 
-            if group.user.telegram_id:
-                try:
-                    if idx == 1:
-                        msg = await bot.send_message(
-                            group.user.telegram_id, f"Прогресс парсинга группы: {group.title}\n{progress_bar}",
-                        )
-                    else:  # дальше редактируем
-                        if new_text != last_text:  # 🔴 проверяем
+                if group.user.telegram_id:
+                    try:
+                        if msg is None:
+                            msg = await bot.send_message(group.user.telegram_id, new_text)
+                        elif new_text != last_text:  # 🔴 проверяем
                             await bot.edit_message_text(
                                 chat_id=group.user.telegram_id,
                                 message_id=msg.message_id,
                                 text=new_text,
                             )
-                            last_text = new_text
-                except Exception as e:
-                    logger.warning(f"Не удалось обновить прогресс: {e}")
+                        last_text = new_text
+                    except Exception as e:
+                        logger.warning(f"Не удалось обновить прогресс: {e}")
+
+            pending = [pending[pos] for pos in sorted(skipped)]
+            if not pending or not parser.breaker:
+                break
+
+    if pending:
+        logger.warning(
+            f"Группа '{group.title}': {len(pending)} ссылок не запрошены из-за недоступности сайта"
+        )
+
+    # Отчёт формируется в исходном порядке ссылок группы
+    data = [rows[idx] for idx in sorted(rows)]
 
     if data and group.user.telegram_id:
+        skipped_text = f"Пропущено (сайт недоступен): {len(pending)}\n" if pending else ""
+        if writer.failed:
+            skipped_text += f"Не записано в базу: {writer.failed}\n"
         excel_file = await generate_excel(data)
         await bot.send_document(
             chat_id=group.user.telegram_id,
             document=BufferedInputFile(excel_file.getvalue(), filename=f"{group.title}.xlsx"),
             caption=(
-                f"✅ Парсинг завершён.\nВсего ссылок: {total_links}\nУспешно спарсено: {parsed_links}\n\n"
+                f"✅ Парсинг завершён.\nВсего ссылок: {total_links}\nУспешно спарсено: {parsed_links}\n"
+                f"{skipped_text}\n"
                 f"Отчёт по группе: {group.title}"
             )
         )
@@ -351,21 +560,25 @@ async def process_olx_group(group):
 
             if success:
                 group.last_check = datetime.now(timezone.utc)
-                await group.save()
+                await group.save(update_fields=["last_check"])
 
                 try:
                     async with in_transaction() as conn:
-                        link.views = float(views_count)
-                        link.last_check = datetime.now(timezone.utc)
+                        changed = link.record_check(datetime.now(timezone.utc), views=views_count)
                         link.productName = full_product_title
                         await link.save(using_db=conn)
 
-                        await PriceHistory.create(
-                            product_link=link,
-                            views=views_count,
-                            date=link.last_check,
-                            using_db=conn
-                        )
+                        if changed or config.parser.history_mode != "change":
+                            await PriceHistory.create(
+                                product_link=link,
+                                views=views_count,
+                                date=link.last_check,
+                                using_db=conn
+                            )
+                        else:
+                            # Просмотры не изменились: продлевается последняя запись истории
+                            await PriceHistoryService.extend_latest([(link.id, link.last_check)], using_db=conn)
+                        await GroupService.bump_data_version(group.id, using_db=conn)
                     parsed_links += 1
                     data.append({
                         "Название продукта": full_product_title,
@@ -406,42 +619,104 @@ async def process_olx_group(group):
         )
 
 
+_parse_executor: Optional[Executor] = None
+
+
+def get_parse_executor() -> Optional[Executor]:
+    """Возвращает общий пул для разбора страниц, создавая его при первом обращении."""
+    global _parse_executor
+    if _parse_executor is None:
+        _parse_executor = create_parse_executor(config.parser.executor, config.parser.executor_workers)
+    return _parse_executor
+
+
+def shutdown_parse_executor() -> None:
+    """Останавливает общий пул разбора страниц."""
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+
+
+def create_http_cache() -> Optional[HttpCache]:
+    """Создаёт кэш страниц согласно настройкам парсера."""
+    if not config.parser.cache_enabled:
+        return None
+    return HttpCache(config.parser.cache_max_entries, config.parser.cache_max_age_days)
+
+
+def create_parser(dedupe: bool = False, cache: Optional[HttpCache] = None) -> ProductParser:
+    """Создаёт парсер поверх общего HTTP-клиента приложения."""
+    return ProductParser(
+        http_client.session,
+        config.parser.concurrency,
+        config.parser.per_host_limit,
+        dedupe=dedupe,
+        cache=cache,
+        streaming=config.parser.streaming,
+        executor=get_parse_executor(),
+        limiter=http_client.limiter,
+        breaker=http_client.breaker,
+    )
+
+
 async def parse_satu_groups():
     """Запуск фонового парсера по всем активным группам."""
     logger.info("Запуск фонового парсера...")
-    async with aiohttp.ClientSession() as session:
-        parser = ProductParser(session)
-        groups_satu = await ProductGroup.filter(is_active=True, site__title="SATU KZ").select_related(
-            "user").prefetch_related("product_links")
+    # Один парсер на весь запуск: ссылка, встречающаяся в нескольких группах, запрашивается один раз
+    cache = create_http_cache()
+    parser = create_parser(dedupe=True, cache=cache)
+    groups_satu = await ProductGroup.filter(is_active=True, site__title="SATU KZ").select_related(
+        "user").prefetch_related("product_links")
+
+    if not groups_satu:
+        logger.info("Нет активных групп для парсинга")
+        return
 
-        if not groups_satu:
-            logger.info("Нет активных групп для парсинга")
-            return
+    if cache:
+        await cache.warm(link.url for group in groups_satu for link in group.product_links)
 
-        for group in groups_satu:
-            await process_group(group, parser)
+    # Группы обрабатываются параллельно и делят общий бюджет запросов парсера.
+    # Маленькие группы стартуют первыми, чтобы их отчёты не ждали больших.
+    groups_satu = sorted(groups_satu, key=lambda g: len(g.product_links))
+    semaphore = asyncio.Semaphore(config.parser.group_concurrency)
 
-    logger.info("Фоновый парсинг завершён ✅")
+    async def run(group: ProductGroup):
+        async with semaphore:
+            try:
+                await process_group(group, parser)
+            except Exception as e:
+                logger.error(f"Ошибка обработки группы '{group.title}' (id={group.id}): {e}")
+
+    await asyncio.gather(*(run(group) for group in groups_satu))
+
+    if cache:
+        await cache.flush()
+        await cache.evict()
+
+    for host, rate in parser.limiter.rates().items():
+        logger.info(f"Скорость запросов к {host} на конец запуска: {rate:.2f} запр/с")
+
+    logger.info(f"Фоновый парсинг завершён ✅ (повторных запросов сэкономлено: {parser.deduplicated})")
 
 
 async def parse_olx_groups():
     """Запуск фонового парсера по всем активным группам."""
     logger.info("Запуск фонового парсера...")
-    async with aiohttp.ClientSession() as session:
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    seven_days_ago = datetime.utcnow() - timedelta(days=7)
 
-        groups_olx = await ProductGroup.filter(
-            is_active=True,
-            site__title="OLX KZ",
-            last_check__lte=seven_days_ago
-        ).select_related("user").prefetch_related("product_links")
+    groups_olx = await ProductGroup.filter(
+        is_active=True,
+        site__title="OLX KZ",
+        last_check__lte=seven_days_ago
+    ).select_related("user").prefetch_related("product_links")
 
-        if not groups_olx:
-            logger.info("Нет активных групп для парсинга")
-            return
+    if not groups_olx:
+        logger.info("Нет активных групп для парсинга")
+        return
 
-        for group in groups_olx:
-            await process_olx_group(group)
+    for group in groups_olx:
+        await process_olx_group(group)
 
     logger.info("Фоновый парсинг завершён ✅")
 
@@ -456,9 +731,13 @@ async def parse_single_group(group_id: int):
         return
 
     if site == 'SATU KZ':
-        async with aiohttp.ClientSession() as session:
-            parser = ProductParser(session)
-            await process_group(group, parser)
+        cache = create_http_cache()
+        parser = create_parser(cache=cache)
+        if cache:
+            await cache.warm(link.url for link in group.product_links)
+        await process_group(group, parser)
+        if cache:
+            await cache.flush()
     else:
         await process_olx_group(group)
 
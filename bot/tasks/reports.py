@@ -0,0 +1,166 @@
+import asyncio
+import io
+import logging
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bot.tasks.executors import create_executor
+from bot.utils.excel import write_report
+from core.config import load_config
+from core.configs.reports import ReportConfig
+
+logger = logging.getLogger(__name__)
+
+ReportJob = Callable[[], Awaitable[None]]
+
+
+class ReportRejectedError(Exception):
+    """Отчёт не поставлен в очередь: превышен лимит пользователя или очередь заполнена."""
+
+
+class ReportQueue:
+    """Очередь формирования отчётов по запросам пользователей.
+
+    Обработчик кладёт в очередь задачу (сбор данных, отрисовка файла и отправка)
+    и сразу отвечает пользователю. Задачи выполняют workers фоновых обработчиков,
+    а сама отрисовка xlsx идёт в отдельном пуле, поэтому большой отчёт не
+    задерживает нажатия кнопок другими администраторами. У одного пользователя
+    одновременно не больше per_user_limit отчётов в очереди и в работе.
+    Запускается и останавливается вместе с ботом в bot.main.main.
+    """
+
+    def __init__(self, report_config: ReportConfig):
+        self.config = report_config
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._active: Dict[int, int] = {}
+        self._executor: Optional[Executor] = None
+        self._executor_created = False
+
+    def start(self) -> None:
+        """Запускает фоновые обработчики. Вызывается внутри работающего event loop."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.config.workers)]
+        logger.info(f"Очередь отчётов запущена: обработчиков {self.config.workers}")
+
+    def submit(self, user_id: int, job: ReportJob) -> None:
+        """Ставит задачу отчёта в очередь или отклоняет её ReportRejectedError."""
+        if self._queue is None:
+            raise RuntimeError("Очередь отчётов не запущена")
+        if self._active.get(user_id, 0) >= self.config.per_user_limit:
+            raise ReportRejectedError("⏳ Ваш предыдущий отчёт ещё формируется, дождитесь его")
+        try:
+            self._queue.put_nowait((user_id, job))
+        except asyncio.QueueFull:
+            raise ReportRejectedError("⏳ Сейчас формируется много отчётов, попробуйте через минуту")
+        self._active[user_id] = self._active.get(user_id, 0) + 1
+
+    async def _worker(self) -> None:
+        while True:
+            user_id, job = await self._queue.get()
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Ошибка при формировании отчёта для {user_id}: {e}")
+            finally:
+                self._release(user_id)
+                self._queue.task_done()
+
+    def _release(self, user_id: int) -> None:
+        self._active[user_id] -= 1
+        if not self._active[user_id]:
+            del self._active[user_id]
+
+    def _get_executor(self) -> Optional[Executor]:
+        if not self._executor_created:
+            self._executor = create_executor(self.config.executor, self.config.workers, "report")
+            self._executor_created = True
+        return self._executor
+
+    async def render(self, data, sheet_name: str = "Sheet1", bordered: bool = True) -> io.BytesIO:
+        """Отрисовывает xlsx-отчёт в пуле отчётов, не блокируя event loop."""
+        executor = self._get_executor()
+        if executor is None:
+            return write_report(data, sheet_name, bordered)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(write_report, data, sheet_name, bordered))
+
+    async def close(self) -> None:
+        """Останавливает обработчики и пул отрисовки."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._active.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._executor_created = False
+        logger.info("Очередь отчётов остановлена")
+
+
+@dataclass
+class CachedReport:
+    """Готовый отчёт: содержимое файла и file_id документа, уже отправленного в Telegram."""
+    data: bytes
+    filename: str
+    caption: str
+    version: int = 0
+    file_id: Optional[str] = None
+
+
+class ReportCache:
+    """Кэш готовых отчётов по ключу (группа, тип отчёта, версия данных группы).
+
+    Версия данных группы увеличивается при каждой записи результатов и изменении
+    ссылок, поэтому отчёт из кэша всегда построен по актуальным данным.
+    Для каждой пары (группа, тип) хранится только последняя версия. Когда число
+    отчётов или их общий размер превышает лимит, вытесняются давно не запрошенные.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[int, str], CachedReport]" = OrderedDict()
+
+    def get(self, group_id: int, report_type: str, version: int) -> Optional[CachedReport]:
+        """Возвращает отчёт, если он построен по указанной версии данных группы."""
+        key = (group_id, report_type)
+        report = self._entries.get(key)
+        if report is None or report.version != version:
+            return None
+        self._entries.move_to_end(key)
+        return report
+
+    def put(self, group_id: int, report_type: str, version: int, report: CachedReport) -> None:
+        """Сохраняет отчёт, заменяя отчёт того же типа по предыдущей версии."""
+        key = (group_id, report_type)
+        current = self._entries.get(key)
+        if current is not None:
+            if current.version > version:
+                return
+            self._remove(key)
+        if len(report.data) > self.max_bytes:
+            return
+
+        report.version = version
+        self._entries[key] = report
+        self.size += len(report.data)
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[int, str]) -> None:
+        report = self._entries.pop(key)
+        self.size -= len(report.data)
+
+
+reports_config = load_config().reports
+report_queue = ReportQueue(reports_config)
+report_cache = ReportCache(reports_config.cache_max_entries, reports_config.cache_max_mb * 1024 * 1024)
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from tortoise.transactions import in_transaction
+
+from bot.database.models.price_history import PriceHistory
+from bot.database.models.product_link import ProductLink
+from bot.services.group import GroupService
+from bot.services.price_history import PriceHistoryService
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BatchWriter:
+    """Пакетная запись результатов парсинга.
+
+    Результаты попадают во внутреннюю очередь, из которой их забирает фоновая
+    задача и записывает пачками: bulk_update ссылок и bulk_create истории цен.
+    При change_only результат с неизменившимся значением не добавляет запись
+    истории, а продлевает последнюю запись ссылки. Если указан group_id, каждая
+    записанная пачка увеличивает версию данных группы.
+    Каждая пачка пишется в своей короткой транзакции, когда накоплено batch_size
+    результатов или с предыдущей записи прошло flush_interval секунд. Поэтому
+    соединение с базой не удерживается на время сетевых запросов, результаты
+    видны по мере парсинга, а ошибка записи теряет только одну пачку.
+
+    Использование:
+        async with BatchWriter(fields) as writer:
+            await writer.add(link, history, changed)
+    """
+
+    def __init__(
+            self,
+            fields: Sequence[str],
+            batch_size: int = 500,
+            flush_interval: float = 5.0,
+            change_only: bool = False,
+            group_id: Optional[int] = None,
+    ):
+        self.fields = list(fields)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.change_only = change_only
+        self.group_id = group_id
+        self.written = 0
+        self.failed = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=batch_size * 2)
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "BatchWriter":
+        self._task = asyncio.create_task(self._consume())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if not self._task.done():
+            await self._put(_STOP)
+        # Если фоновая задача упала, её исключение поднимается здесь
+        await self._task
+
+    async def add(self, link: ProductLink, history: PriceHistory, changed: bool = True) -> None:
+        """Ставит результат парсинга ссылки в очередь на запись."""
+        if self._task is None or self._task.done():
+            raise RuntimeError("BatchWriter не запущен")
+        await self._put((link, history, changed))
+
+    async def _put(self, item) -> None:
+        """Кладёт элемент в очередь; ожидание прерывается, если фоновая задача завершилась.
+
+        Очередь ограничена, и без фоновой задачи её никто не разберёт: put ждал бы вечно.
+        """
+        put = asyncio.ensure_future(self._queue.put(item))
+        await asyncio.wait({put, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        if put.done():
+            return
+        put.cancel()
+        await self._task
+        raise RuntimeError("Фоновая запись результатов парсинга завершилась")
+
+    async def _consume(self) -> None:
+        batch: List[Tuple[ProductLink, PriceHistory, bool]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                item = None
+
+            if item is not None and item is not _STOP:
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+
+            await self._flush(batch)
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            if item is _STOP:
+                return
+
+    async def _flush(self, batch: List[Tuple[ProductLink, PriceHistory, bool]]) -> None:
+        if not batch:
+            return
+        links = [link for link, _, _ in batch]
+        history = [record for _, record, changed in batch if changed or not self.change_only]
+        extended = [(link.id, record.date) for link, record, changed in batch if not changed and self.change_only]
+        try:
+            async with in_transaction() as conn:
+                await ProductLink.bulk_update(links, fields=self.fields, using_db=conn)
+                if history:
+                    await PriceHistory.bulk_create(history, using_db=conn)
+                await PriceHistoryService.extend_latest(extended, using_db=conn)
+                if self.group_id is not None:
+                    await GroupService.bump_data_version(self.group_id, using_db=conn)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Не удалось записать пачку из {len(batch)} результатов: {e}")
+            return
+        self.written += len(batch)
+        logger.debug(f"Записано результатов парсинга: {len(batch)}")
@@ -0,0 +1,78 @@
+import io
+from typing import Dict, List, Union
+
+import pandas as pd
+import xlsxwriter
+
+# Ширина колонок по заголовку: первое совпавшее правило задаёт ширину колонки
+COLUMN_WIDTH_RULES = (
+    (("Название компании",), 23),
+    (("Название продукта", "Название товара"), 50),
+    (("Ссылка на товар", "Ссылка"), 50),
+    (("Дата последней проверки",), 15),
+    (("Стоимость",), 15),
+    (("Кол-во просмотров",), 15),
+)
+MAX_AUTO_WIDTH = 50
+
+WORKBOOK_OPTIONS = {
+    # Строки сбрасываются на диск по мере записи, память не растёт с размером отчёта
+    "constant_memory": True,
+    "strings_to_urls": False,
+    "remove_timezone": True,
+    "nan_inf_to_errors": True,
+}
+
+
+def column_width(header: str, values: pd.Series) -> float:
+    """Ширина колонки: по правилам для заголовка, иначе по самой длинной строке значений."""
+    for names, width in COLUMN_WIDTH_RULES:
+        if any(name in header for name in names):
+            return width
+
+    if pd.api.types.is_numeric_dtype(values):
+        # Длина числа определяется крайними значениями, строки по всей колонке не строятся
+        extremes = values.agg(["min", "max"]).dropna()
+        max_length = max([len(header), *(len(str(value)) for value in extremes)])
+        return min((max_length + 2) * 1.1, MAX_AUTO_WIDTH)
+
+    lines = values.dropna().astype(str).str.split("\n").explode()
+    max_length = max(int(lines.str.len().max()) if not lines.empty else 0, len(header))
+    return min((max_length + 2) * 1.1, MAX_AUTO_WIDTH)
+
+
+def write_report(
+        data: Union[pd.DataFrame, List[Dict]],
+        sheet_name: str = "Sheet1",
+        bordered: bool = True,
+) -> io.BytesIO:
+    """
+    Записывает таблицу в xlsx и возвращает файл в памяти.
+
+    Строки пишутся потоково (constant_memory), формат ячеек и ширина задаются
+    один раз на колонку, а не на каждую ячейку.
+    """
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    output = io.BytesIO()
+
+    workbook = xlsxwriter.Workbook(output, WORKBOOK_OPTIONS)
+    worksheet = workbook.add_worksheet(sheet_name)
+
+    header_format = workbook.add_format({"bold": True, "align": "center", "valign": "top", "text_wrap": True})
+    cell_format = None
+    if bordered:
+        header_format.set_border(1)
+        cell_format = workbook.add_format({"text_wrap": True, "border": 1})
+
+    headers = [str(column) for column in df.columns]
+    for col, header in enumerate(headers):
+        worksheet.set_column(col, col, column_width(header, df.iloc[:, col]), cell_format)
+
+    worksheet.write_row(0, 0, headers, header_format)
+    values = df.astype(object).where(df.notna(), None)
+    for row, record in enumerate(values.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row, 0, record)
+
+    workbook.close()
+    output.seek(0)
+    return output
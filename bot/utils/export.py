@@ -0,0 +1,125 @@
+import asyncio
+import csv
+import gzip
+import io
+from typing import AsyncIterator, Callable, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from bot.services.price_history import HISTORY_EXPORT_COLUMNS, PriceHistoryService
+
+# Telegram принимает от бота документы до 50 МБ. Часть закрывается, когда её размер
+# превысил EXPORT_PART_LIMIT: запас покрывает последнюю пачку и данные, ещё не сброшенные компрессором
+TELEGRAM_FILE_LIMIT = 50 * 1024 * 1024
+EXPORT_PART_LIMIT = TELEGRAM_FILE_LIMIT - 5 * 1024 * 1024
+# Сколько строк пишется в часть за раз: после каждой пачки проверяется размер части
+EXPORT_BATCH_SIZE = 10000
+
+HISTORY_SCHEMA = pa.schema([
+    ("link_id", pa.int32()),
+    ("url", pa.string()),
+    ("product_name", pa.string()),
+    ("company_name", pa.string()),
+    ("price", pa.int32()),
+    ("views", pa.int32()),
+    ("date", pa.timestamp("us", tz="UTC")),
+    ("valid_to", pa.timestamp("us", tz="UTC")),
+    ("checks", pa.int32()),
+])
+
+ExportPart = Tuple[str, bytes]
+
+
+class CsvGzipPart:
+    """Одна часть выгрузки: CSV, сжатый gzip на лету в памяти."""
+
+    extension = ".csv.gz"
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self._gzip = gzip.GzipFile(fileobj=self.buffer, mode="wb", compresslevel=6)
+        # utf-8-sig, чтобы Excel открывал кириллицу без выбора кодировки
+        self._text = io.TextIOWrapper(self._gzip, encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._text)
+        self._writer.writerow(HISTORY_EXPORT_COLUMNS)
+
+    @property
+    def size(self) -> int:
+        return self.buffer.tell()
+
+    def write(self, rows: list) -> None:
+        self._writer.writerows(rows)
+        self._text.flush()
+
+    def close(self) -> bytes:
+        self._text.close()
+        return self.buffer.getvalue()
+
+
+class ParquetPart:
+    """Одна часть выгрузки: Parquet-файл, каждая пачка строк записывается отдельной группой строк."""
+
+    extension = ".parquet"
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self._writer = pq.ParquetWriter(self.buffer, HISTORY_SCHEMA, compression="zstd")
+
+    @property
+    def size(self) -> int:
+        return self.buffer.tell()
+
+    def write(self, rows: list) -> None:
+        columns = zip(*rows)
+        arrays = [pa.array(values, type=field.type) for values, field in zip(columns, HISTORY_SCHEMA)]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=HISTORY_SCHEMA))
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self.buffer.getvalue()
+
+
+async def export_history(group_id: int, name: str, part_class: Callable) -> AsyncIterator[ExportPart]:
+    """
+    Выгружает полную историю группы частями (имя файла, содержимое).
+
+    История читается страницами по ссылкам, соединение с базой не держится, пока часть
+    отправляется. Строки пишутся пачками по EXPORT_BATCH_SIZE и сжимаются в отдельном
+    потоке, в памяти одновременно не больше одной части. Если история не помещается
+    в один документ Telegram, части нумеруются: name_1, name_2 и т.д.
+    Пустая история не даёт ни одной части.
+    """
+    part, ready, number = None, None, 0
+    async for page in PriceHistoryService.iter_history(group_id):
+        for start in range(0, len(page), EXPORT_BATCH_SIZE):
+            # Закрытая часть отдаётся, только когда известно, что за ней будут ещё строки
+            if ready is not None:
+                number += 1
+                yield f"{name}_{number}{part_class.extension}", ready
+                ready = None
+
+            if part is None:
+                part = part_class()
+            await asyncio.to_thread(part.write, page[start:start + EXPORT_BATCH_SIZE])
+            if part.size >= EXPORT_PART_LIMIT:
+                ready = await asyncio.to_thread(part.close)
+                part = None
+
+    if part is not None:
+        ready = await asyncio.to_thread(part.close)
+    if ready is not None:
+        if number:
+            yield f"{name}_{number + 1}{part_class.extension}", ready
+        else:
+            yield f"{name}{part_class.extension}", ready
+
+
+def export_history_csv(group_id: int, name: str) -> AsyncIterator[ExportPart]:
+    """Полная история группы в CSV, сжатом gzip."""
+    return export_history(group_id, name, CsvGzipPart)
+
+
+def export_history_parquet(group_id: int, name: str) -> AsyncIterator[ExportPart]:
+    """Полная история группы в Parquet."""
+    return export_history(group_id, name, ParquetPart)
@@ -1,53 +1,78 @@
+import asyncio
 import io
 import logging
+from dataclasses import dataclass
 from typing import Any, Optional
 
 import pandas as pd
 from aiogram.types import Message
-from openpyxl.utils import get_column_letter
 
-from bot.database.models.price_history import PriceHistory
 from bot.database.models.product_link import ProductLink
 from bot.keyboards.group import group_detail_keyboard
 from bot.services.group import GroupService
+from bot.services.link import LinkService
+from bot.services.price_history import PriceHistoryService
 from bot.tasks.parse import generate_excel
+from bot.tasks.reports import report_queue
 
 logger = logging.getLogger(__name__)
 
 
-async def _process_links(urls: pd.Series, group_id: int, site_title: str) -> int:
+# Допустимое начало ссылок для каждого сайта
+SITE_URL_PREFIXES = {
+    "SATU KZ": "https://satu.kz",
+    "OLX KZ": "https://www.olx.kz",
+}
+MAX_URL_LENGTH = 500
+# Сколько последних дней попадает в отчёт по истории: в листе Excel не больше 16384 колонок
+HISTORY_MAX_DAYS = 16000
+
+
+@dataclass
+class LinkImportResult:
+    """Итог загрузки ссылок из таблицы"""
+    inserted: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    existing: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.invalid + self.duplicates + self.existing
+
+    def __add__(self, other: "LinkImportResult") -> "LinkImportResult":
+        return LinkImportResult(
+            inserted=self.inserted + other.inserted,
+            invalid=self.invalid + other.invalid,
+            duplicates=self.duplicates + other.duplicates,
+            existing=self.existing + other.existing,
+        )
+
+
+async def _process_links(urls: pd.Series, group_id: int, site_title: str) -> LinkImportResult:
     """Обработка и сохранение списка ссылок"""
-    created_count = 0
-    for url in urls.dropna().unique():
-        url = str(url).strip()
-        if not url:
-            continue
+    result = LinkImportResult()
+
+    # Нормализация: строки без пробелов по краям и без якоря
+    urls = urls.dropna().astype(str).str.strip().str.replace(r"#.*$", "", regex=True)
+    urls = urls[urls != ""]
+
+    prefix = SITE_URL_PREFIXES.get(site_title, SITE_URL_PREFIXES["OLX KZ"])
+    valid = urls.str.startswith(prefix) & (urls.str.len() <= MAX_URL_LENGTH)
+    result.invalid = int((~valid).sum())
+    if result.invalid:
+        logger.warning(
+            f"Пропущено {result.invalid} ссылок: должны начинаться с {prefix}, например {urls[~valid].iloc[0]}"
+        )
 
-        if site_title == "SATU KZ":
-            # Валидация: проверяем, что ссылка начинается с https://satu.kz
-            if not url.startswith('https://satu.kz'):
-                logger.warning(f"Пропущена ссылка {url}: должна начинаться с https://satu.kz")
-                continue
-        else:
-            # Валидация: проверяем, что ссылка начинается с https://satu.kz
-            if not url.startswith('https://www.olx.kz'):
-                logger.warning(f"Пропущена ссылка {url}: должна начинаться с https://www.olx.kz")
-                continue
-
-        try:
-            await ProductLink.create(
-                group_id=group_id,
-                url=url,
-                companyName=None,
-                productName=None,
-                last_price=None,
-                last_check=None
-            )
-            created_count += 1
-        except Exception as e:
-            logger.warning(f"Ошибка при добавлении ссылки в базу {url}: {e}")
-
-    return created_count
+    unique_urls = urls[valid].drop_duplicates()
+    result.duplicates = int(valid.sum()) - len(unique_urls)
+
+    result.inserted = await LinkService.bulk_insert_links(group_id, unique_urls.tolist())
+    result.existing = len(unique_urls) - result.inserted
+    if result.inserted:
+        await GroupService.bump_data_version(group_id)
+    return result
 
 
 async def _send_group_info(
@@ -87,47 +112,51 @@ def _generate_group_info_text(group: Any, links_count: Optional[int] = None) ->
     return base_text
 
 
+def _format_views_diff(diff: int) -> str:
+    if diff > 0:
+        return f"➕{diff}"
+    if diff < 0:
+        return f"➖{abs(diff)}"
+    return "0"
+
+
 async def generate_total_views_diff_excel(group_id: int) -> io.BytesIO:
     """
-    Сравнивает только ПОСЛЕДНИЙ и ПРЕДПОСЛЕДНИЙ парсинг.
-    Показывает прирост просмотров за этот период.
+    Показывает прирост просмотров с первой проверки и с предыдущей проверки.
+    Данные берутся из снимка истории в ProductLink, PriceHistory не читается.
     """
-    links = await ProductLink.filter(group_id=group_id).all()
+    links = await ProductLink.filter(group_id=group_id).order_by("id")
     if not links:
         return None
 
     data_rows = []
 
     for link in links:
-        current_rec = await PriceHistory.filter(product_link=link).order_by('-date').first()
-
-        if not current_rec:
+        if link.last_check is None:
             continue
 
-        first_rec = await PriceHistory.filter(product_link=link).order_by('date').first()
-
-        current_views = current_rec.views if current_rec.views is not None else 0
-
-        first_views = first_rec.views if first_rec.views is not None else 0
+        current_views = link.last_views or 0
+        first_views = link.first_views or 0
 
-        diff = current_views - first_views
-
-        if diff > 0:
-            sign = f"➕{diff}"
-        elif diff < 0:
-            sign = f"➖{abs(diff)}"
+        if link.prev_check is not None:
+            prev_views = link.prev_views or 0
+            since_prev = _format_views_diff(current_views - prev_views)
+            prev_str = f"{prev_views} ({link.prev_check.strftime('%d.%m.%Y %H:%M')})"
         else:
-            sign = "0"
+            since_prev = "ℹ️ Данных недостаточно"
+            prev_str = "N/A"
 
-        prev_date_str = first_rec.date.strftime("%d.%m.%Y %H:%M")
+        first_str = f"{first_views} ({link.first_check.strftime('%d.%m.%Y %H:%M')})" if link.first_check else "N/A"
 
         data_rows.append({
             "Название продукта": link.productName,
             "Ссылка": link.url,
             "Текущие просмотры": current_views,
-            "Общий прирост": sign,
-            "Было на старте": f"{first_views} ({prev_date_str})",
-            "Дата последнего": current_rec.date.strftime("%d.%m.%Y %H:%M")
+            "Общий прирост": _format_views_diff(current_views - first_views),
+            "Прирост с прошлой проверки": since_prev,
+            "Было на старте": first_str,
+            "Было на прошлой проверке": prev_str,
+            "Дата последнего": link.last_check.strftime("%d.%m.%Y %H:%M")
         })
 
     if not data_rows:
@@ -142,64 +171,63 @@ async def generate_price_diff_excel(group_id: int) -> io.BytesIO:
     Генерация Excel с анализом разницы между последней и предпоследней ценой
     для всех ссылок в группе.
     """
-    links = await ProductLink.filter(group_id=group_id).all()
-    if not links:
+    # Весь анализ считается в базе одним запросом
+    df = pd.DataFrame(await PriceHistoryService.get_price_diff(group_id))
+    if df.empty:
         return None
 
-    data_rows = []
-    for link in links:
-        # Берём последние две цены
-        price_objs = await PriceHistory.filter(product_link=link).order_by('-date').limit(2)
-
-        if len(price_objs) < 2:
-            # Мало данных для сравнения
-            data_rows.append(
-                {
-                    "Компания": link.companyName or "",
-                    "Товар": link.productName or "",
-                    "Последняя цена": price_objs[0].price if price_objs else None,
-                    "Предыдущая цена": None,
-                    "Разница": None,
-                    "%": None,
-                    "Символ": "ℹ️ Данных недостаточно",
-                    "Ссылка": link.url
-                }
-            )
-            continue
+    return await report_queue.render(df, sheet_name="Анализ цен", bordered=False)
 
-        last_price = price_objs[0]
-        prev_price = price_objs[1]
-
-        diff = last_price.price - prev_price.price
-        percent = (diff / prev_price.price * 100) if prev_price.price else 0
-        sign = "🔺" if diff > 0 else ("🔻" if diff < 0 else "➖")
-
-        data_rows.append(
-            {
-                "Компания": link.companyName or "",
-                "Товар": link.productName or "",
-                "Предыдущая цена": prev_price.price,
-                "Последняя цена": last_price.price,
-                "Разница": diff,
-                "%": percent,
-                "Символ": sign,
-                "Ссылка": link.url
-            }
-        )
 
-    if not data_rows:
-        return None
+def build_history_pivot(history: pd.DataFrame, links: pd.DataFrame, value: str) -> pd.DataFrame:
+    """
+    Разворачивает дневную историю в таблицу «ссылки × даты» с последним значением за день
+    и добавляет минимум, максимум, среднее и волатильность (стандартное отклонение
+    дневных изменений в процентах). Все вычисления векторные, без циклов по строкам.
+    history — результат PriceHistoryService.get_daily_history,
+    links — данные ссылок с индексом по id, задают строки и их порядок.
+    """
+    history["day"] = pd.to_datetime(history["day"], unit="D")
+    history["valid_until"] = pd.to_datetime(history["valid_until"], unit="D")
 
-    df = pd.DataFrame(data_rows)
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Анализ цен")
-        worksheet = writer.sheets["Анализ цен"]
+    days = pd.date_range(history["day"].min(), history["valid_until"].max(), freq="D")
+    daily = history.pivot(index="link_id", columns="day", values=value).reindex(index=links.index, columns=days)
 
-        # Автоширина колонок
-        for col in worksheet.columns:
-            max_length = max((len(str(cell.value)) for cell in col), default=10)
-            worksheet.column_dimensions[get_column_letter(col[0].column)].width = (max_length + 2) * 1.2
+    # Запись действует до следующей записи, но не дольше последней проверки ссылки
+    covered_until = history.groupby("link_id")["valid_until"].max().reindex(daily.index)
+    daily = daily.ffill(axis=1).mask(days.values[None, :] > covered_until.values[:, None])
 
-    output.seek(0)
-    return output
+    changes = daily.diff(axis=1) / daily.shift(1, axis=1)
+    changes = changes.mask(~changes.abs().lt(float("inf")))
+    stats = pd.DataFrame({
+        "Минимум": daily.min(axis=1),
+        "Максимум": daily.max(axis=1),
+        "Среднее": daily.mean(axis=1).round(2),
+        "Волатильность, %": (changes.std(axis=1) * 100).round(2),
+    })
+
+    daily = daily.iloc[:, -HISTORY_MAX_DAYS:]
+    daily.columns = daily.columns.strftime("%d.%m.%Y")
+    return pd.concat([links, stats, daily], axis=1).reset_index(drop=True)
+
+
+async def generate_history_excel(group_id: int, site_title: str) -> io.BytesIO:
+    """
+    Полная история группы в широком формате: ссылки × даты с последним значением
+    за день (цена для SATU, просмотры для OLX) и сводными колонками по всем дням.
+    Дни, подробная история которых удалена по сроку хранения, берутся из дневных сводок.
+    """
+    data = await PriceHistoryService.get_daily_history(group_id)
+    history = await asyncio.to_thread(pd.read_csv, data, dtype={"price": "float64", "views": "float64"})
+    if history.empty:
+        return None
+
+    links = await ProductLink.filter(group_id=group_id).order_by("id").values("id", "productName", "url")
+    links_df = pd.DataFrame(links).set_index("id").rename(
+        columns={"productName": "Название продукта", "url": "Ссылка"}
+    )
+    value = "price" if site_title == "SATU KZ" else "views"
+
+    # Разворот большой истории занимает заметное время, поэтому идёт в отдельном потоке
+    df = await asyncio.to_thread(build_history_pivot, history, links_df, value)
+    return await report_queue.render(df, sheet_name="История", bordered=False)
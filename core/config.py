@@ -1,10 +1,12 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 from decouple import config
 
 from core.configs.bot import TgBot
 from core.configs.database import DbConfig
+from core.configs.parser import ParserConfig
+from core.configs.reports import ReportConfig
 
 
 @dataclass
@@ -19,11 +21,17 @@ class Config:
         Содержит настройки, связанные с Telegram-ботом.
     db : Необязательно[DbConfig]
         Содержит настройки, относящиеся к базе данных (по умолчанию — None).
+    parser : ParserConfig
+        Содержит настройки фонового парсера.
+    reports : ReportConfig
+        Содержит настройки очереди формирования отчётов.
 
     """
 
     tg_bot: TgBot
     db: Optional[DbConfig] = None
+    parser: ParserConfig = field(default_factory = ParserConfig)
+    reports: ReportConfig = field(default_factory = ReportConfig)
 
 
 def load_config() -> Config:
@@ -32,4 +40,6 @@ def load_config() -> Config:
     return Config(
         tg_bot = TgBot.from_env(config),
         db = DbConfig.from_env(config),
+        parser = ParserConfig.from_env(config),
+        reports = ReportConfig.from_env(config),
     )
@@ -100,6 +100,8 @@ TORTOISE_ORM = {
                 "bot.database.models.price_history",
                 "bot.database.models.product_link",
                 "bot.database.models.site",
+                "bot.database.models.page_cache",
+                "bot.database.models.price_history_rollup",
                 "aerich.models"
             ],
             "default_connection": "default",
@@ -0,0 +1,145 @@
+from dataclasses import dataclass
+
+from decouple import config
+
+
+@dataclass
+class ParserConfig:
+    """Класс конфигурации парсера. Этот класс содержит настройки
+    фонового парсинга, такие как степень параллелизма запросов.
+
+    Атрибуты
+    ----------
+    concurrency : int
+        Максимальное количество одновременных запросов парсера.
+    per_host_limit : int
+        Максимальное количество одновременных запросов к одному хосту.
+    group_concurrency : int
+        Максимальное количество групп, обрабатываемых одновременно.
+    cache_enabled : bool
+        Использовать ли кэш страниц с условными запросами.
+    cache_max_entries : int
+        Максимальное количество записей в кэше страниц.
+    cache_max_age_days : int
+        Срок (в днях), после которого страница загружается заново целиком.
+    streaming : bool
+        Извлекать ли поля товара потоково, без построения DOM. Остаток страницы после
+        найденных полей дочитывается (до ProductParser.DRAIN_LIMIT), чтобы сохранить соединение.
+    executor : str
+        Пул для разбора страниц вне event loop: "process", "thread" или "none".
+        Процессы пула запускаются через spawn, страница передаётся в них через pickle.
+    executor_workers : int
+        Количество воркеров пула разбора.
+    rate_initial : float
+        Начальная скорость запросов к одному хосту, запр/с.
+    rate_min : float
+        Минимальная скорость запросов к одному хосту, запр/с.
+    rate_max : float
+        Максимальная скорость запросов к одному хосту, запр/с.
+    breaker_failure_rate : float
+        Доля неудачных запросов, при которой хост считается недоступным.
+    breaker_window : int
+        Количество последних запросов, по которым считается доля неудач.
+    breaker_min_calls : int
+        Минимальное количество запросов в окне для срабатывания предохранителя.
+    breaker_reset_timeout : float
+        Пауза (в секундах) перед пробным запросом к недоступному хосту.
+    retry_passes : int
+        Количество повторных проходов по ссылкам, пропущенным из-за недоступности сайта.
+    connection_limit : int
+        Размер пула соединений общего HTTP-клиента.
+    dns_cache_ttl : int
+        Время (в секундах) хранения адресов в кэше DNS.
+    keepalive_timeout : float
+        Время (в секундах) жизни простаивающего keep-alive соединения.
+    db_batch_size : int
+        Количество результатов парсинга, записываемых в базу одной пачкой.
+    db_flush_interval : float
+        Максимальное время (в секундах) между записями пачек в базу.
+    history_mode : str
+        Хранение истории цен: "change" — новая запись только при изменении значения,
+        иначе продлевается текущая; "append" — запись на каждую проверку.
+    history_retention_months : int
+        Сколько месяцев хранить подробную историю цен; более старые месячные
+        секции удаляются, анализ за их период берётся из сводок. 0 — хранить всё.
+
+    """
+
+    concurrency: int = 10
+    per_host_limit: int = 5
+    group_concurrency: int = 3
+    cache_enabled: bool = True
+    cache_max_entries: int = 50000
+    cache_max_age_days: int = 30
+    streaming: bool = True
+    executor: str = "process"
+    executor_workers: int = 2
+    rate_initial: float = 5.0
+    rate_min: float = 0.5
+    rate_max: float = 20.0
+    breaker_failure_rate: float = 0.5
+    breaker_window: int = 20
+    breaker_min_calls: int = 10
+    breaker_reset_timeout: float = 60.0
+    retry_passes: int = 5
+    connection_limit: int = 100
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    db_batch_size: int = 500
+    db_flush_interval: float = 5.0
+    history_mode: str = "change"
+    history_retention_months: int = 0
+
+    @staticmethod
+    def from_env(env: config):
+        """Создает объект ParserConfig из переменных среды."""
+        concurrency = env("PARSER_CONCURRENCY", default = 10, cast = int)
+        per_host_limit = env("PARSER_PER_HOST_LIMIT", default = 5, cast = int)
+        group_concurrency = env("PARSER_GROUP_CONCURRENCY", default = 3, cast = int)
+        cache_enabled = env("PARSER_CACHE_ENABLED", default = True, cast = bool)
+        cache_max_entries = env("PARSER_CACHE_MAX_ENTRIES", default = 50000, cast = int)
+        cache_max_age_days = env("PARSER_CACHE_MAX_AGE_DAYS", default = 30, cast = int)
+        streaming = env("PARSER_STREAMING", default = True, cast = bool)
+        executor = env("PARSER_EXECUTOR", default = "process")
+        executor_workers = env("PARSER_EXECUTOR_WORKERS", default = 2, cast = int)
+        rate_initial = env("PARSER_RATE_INITIAL", default = 5.0, cast = float)
+        rate_min = env("PARSER_RATE_MIN", default = 0.5, cast = float)
+        rate_max = env("PARSER_RATE_MAX", default = 20.0, cast = float)
+        breaker_failure_rate = env("PARSER_BREAKER_FAILURE_RATE", default = 0.5, cast = float)
+        breaker_window = env("PARSER_BREAKER_WINDOW", default = 20, cast = int)
+        breaker_min_calls = env("PARSER_BREAKER_MIN_CALLS", default = 10, cast = int)
+        breaker_reset_timeout = env("PARSER_BREAKER_RESET_TIMEOUT", default = 60.0, cast = float)
+        retry_passes = env("PARSER_RETRY_PASSES", default = 5, cast = int)
+        connection_limit = env("PARSER_CONNECTION_LIMIT", default = 100, cast = int)
+        dns_cache_ttl = env("PARSER_DNS_CACHE_TTL", default = 300, cast = int)
+        keepalive_timeout = env("PARSER_KEEPALIVE_TIMEOUT", default = 30.0, cast = float)
+        db_batch_size = env("PARSER_DB_BATCH_SIZE", default = 500, cast = int)
+        db_flush_interval = env("PARSER_DB_FLUSH_INTERVAL", default = 5.0, cast = float)
+        history_mode = env("PARSER_HISTORY_MODE", default = "change")
+        history_retention_months = env("PARSER_HISTORY_RETENTION_MONTHS", default = 0, cast = int)
+        return ParserConfig(
+            concurrency = concurrency,
+            per_host_limit = per_host_limit,
+            group_concurrency = group_concurrency,
+            cache_enabled = cache_enabled,
+            cache_max_entries = cache_max_entries,
+            cache_max_age_days = cache_max_age_days,
+            streaming = streaming,
+            executor = executor,
+            executor_workers = executor_workers,
+            rate_initial = rate_initial,
+            rate_min = rate_min,
+            rate_max = rate_max,
+            breaker_failure_rate = breaker_failure_rate,
+            breaker_window = breaker_window,
+            breaker_min_calls = breaker_min_calls,
+            breaker_reset_timeout = breaker_reset_timeout,
+            retry_passes = retry_passes,
+            connection_limit = connection_limit,
+            dns_cache_ttl = dns_cache_ttl,
+            keepalive_timeout = keepalive_timeout,
+            db_batch_size = db_batch_size,
+            db_flush_interval = db_flush_interval,
+            history_mode = history_mode,
+            history_retention_months = history_retention_months,
+        )
@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+
+from decouple import config
+
+
+@dataclass
+class ReportConfig:
+    """Класс конфигурации отчётов. Этот класс содержит настройки
+    очереди формирования Excel-отчётов по запросам пользователей.
+
+    Атрибуты
+    ----------
+    workers : int
+        Количество отчётов, формируемых одновременно.
+    queue_size : int
+        Максимальное количество отчётов в очереди; при заполнении новые запросы отклоняются.
+    per_user_limit : int
+        Максимальное количество отчётов одного пользователя в очереди и в работе.
+    executor : str
+        Пул для отрисовки файлов: "thread" (по умолчанию), "process" или "none" (в event loop).
+        Запись xlsx в режиме constant_memory — в основном работа со строками и файлом,
+        пула потоков достаточно. "process" передаёт таблицу и готовую книгу через pickle,
+        из-за чего обе на время передачи занимают память дважды.
+    cache_max_entries : int
+        Максимальное количество готовых отчётов в кэше.
+    cache_max_mb : int
+        Максимальный суммарный размер (в мегабайтах) отчётов в кэше.
+
+    """
+
+    workers: int = 2
+    queue_size: int = 20
+    per_user_limit: int = 1
+    executor: str = "thread"
+    cache_max_entries: int = 100
+    cache_max_mb: int = 64
+
+    @staticmethod
+    def from_env(env: config):
+        """Создает объект ReportConfig из переменных среды."""
+        workers = env("REPORT_WORKERS", default = 2, cast = int)
+        queue_size = env("REPORT_QUEUE_SIZE", default = 20, cast = int)
+        per_user_limit = env("REPORT_PER_USER_LIMIT", default = 1, cast = int)
+        executor = env("REPORT_EXECUTOR", default = "thread")
+        cache_max_entries = env("REPORT_CACHE_MAX_ENTRIES", default = 100, cast = int)
+        cache_max_mb = env("REPORT_CACHE_MAX_MB", default = 64, cast = int)
+        return ReportConfig(
+            workers = workers,
+            queue_size = queue_size,
+            per_user_limit = per_user_limit,
+            executor = executor,
+            cache_max_entries = cache_max_entries,
+            cache_max_mb = cache_max_mb,
+        )
@@ -0,0 +1,19 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "pagecache" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "url" VARCHAR(500) NOT NULL UNIQUE,
+    "etag" VARCHAR(255),
+    "last_modified" VARCHAR(64),
+    "data" JSONB NOT NULL,
+    "fetched_at" TIMESTAMPTZ NOT NULL,
+    "used_at" TIMESTAMPTZ NOT NULL
+);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "pagecache";"""
@@ -0,0 +1,18 @@
+from tortoise import BaseDBAsyncClient
+
+# Индекс строится без блокировки записи в pricehistory. CREATE INDEX CONCURRENTLY не выполняется
+# внутри транзакции: aerich 0.7 применяет такую миграцию командой `aerich upgrade --in-transaction False`,
+# более новые версии читают RUN_IN_TRANSACTION. Оператор в миграции ровно один, иначе PostgreSQL
+# выполнит их в неявной транзакции. Прерванная сборка оставляет невалидный индекс: его нужно удалить
+# (DROP INDEX CONCURRENTLY) и повторить миграцию.
+RUN_IN_TRANSACTION = False
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_pricehistory_link_date" ON "pricehistory" ("product_link_id", "date" DESC);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX CONCURRENTLY IF EXISTS "idx_pricehistory_link_date";"""
@@ -0,0 +1,25 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "productlink" ADD "last_views" INT;
+        ALTER TABLE "productlink" ADD "prev_price" DOUBLE PRECISION;
+        ALTER TABLE "productlink" ADD "prev_views" INT;
+        ALTER TABLE "productlink" ADD "prev_check" TIMESTAMPTZ;
+        ALTER TABLE "productlink" ADD "first_price" DOUBLE PRECISION;
+        ALTER TABLE "productlink" ADD "first_views" INT;
+        ALTER TABLE "productlink" ADD "first_check" TIMESTAMPTZ;
+        ALTER TABLE "productlink" ADD "last_change" TIMESTAMPTZ;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "productlink" DROP COLUMN "last_views";
+        ALTER TABLE "productlink" DROP COLUMN "prev_price";
+        ALTER TABLE "productlink" DROP COLUMN "prev_views";
+        ALTER TABLE "productlink" DROP COLUMN "prev_check";
+        ALTER TABLE "productlink" DROP COLUMN "first_price";
+        ALTER TABLE "productlink" DROP COLUMN "first_views";
+        ALTER TABLE "productlink" DROP COLUMN "first_check";
+        ALTER TABLE "productlink" DROP COLUMN "last_change";"""
@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "pricehistory" ADD "valid_to" TIMESTAMPTZ;
+        ALTER TABLE "pricehistory" ADD "checks" INT NOT NULL DEFAULT 1;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "pricehistory" DROP COLUMN "valid_to";
+        ALTER TABLE "pricehistory" DROP COLUMN "checks";"""
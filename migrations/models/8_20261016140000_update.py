@@ -0,0 +1,73 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "pricehistory" RENAME TO "pricehistory_old";
+        ALTER INDEX IF EXISTS "idx_pricehistory_link_date" RENAME TO "idx_pricehistory_old_link_date";
+        CREATE TABLE "pricehistory" (
+    "id" INT NOT NULL DEFAULT nextval('pricehistory_id_seq'),
+    "price" INT,
+    "views" INT,
+    "date" TIMESTAMPTZ NOT NULL,
+    "valid_to" TIMESTAMPTZ,
+    "checks" INT NOT NULL DEFAULT 1,
+    "product_link_id" INT NOT NULL REFERENCES "productlink" ("id") ON DELETE CASCADE,
+    PRIMARY KEY ("id", "date")
+) PARTITION BY RANGE ("date");
+        ALTER SEQUENCE "pricehistory_id_seq" OWNED BY "pricehistory"."id";
+        CREATE TABLE "pricehistory_default" PARTITION OF "pricehistory" DEFAULT;
+        DO $$
+        DECLARE
+            month_start TIMESTAMPTZ;
+        BEGIN
+            month_start := date_trunc('month', COALESCE((SELECT min("date") FROM "pricehistory_old"), now()));
+            WHILE month_start < date_trunc('month', now()) + INTERVAL '3 months' LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF "pricehistory" FOR VALUES FROM (%L) TO (%L)',
+                    'pricehistory_p' || to_char(month_start, 'YYYY_MM'),
+                    month_start,
+                    month_start + INTERVAL '1 month'
+                );
+                month_start := month_start + INTERVAL '1 month';
+            END LOOP;
+        END $$;
+        INSERT INTO "pricehistory" ("id", "price", "views", "date", "valid_to", "checks", "product_link_id")
+            SELECT "id", "price", "views", "date", "valid_to", "checks", "product_link_id" FROM "pricehistory_old";
+        DROP TABLE "pricehistory_old";
+        CREATE INDEX "idx_pricehistory_link_date" ON "pricehistory" ("product_link_id", "date" DESC);
+        CREATE TABLE IF NOT EXISTS "pricehistoryrollup" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "period" VARCHAR(8) NOT NULL,
+    "period_start" TIMESTAMPTZ NOT NULL,
+    "min_price" INT,
+    "max_price" INT,
+    "last_price" INT,
+    "min_views" INT,
+    "max_views" INT,
+    "last_views" INT,
+    "count" INT NOT NULL,
+    "product_link_id" INT NOT NULL REFERENCES "productlink" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_pricehistor_product_period" UNIQUE ("product_link_id", "period", "period_start")
+);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "pricehistoryrollup";
+        ALTER TABLE "pricehistory" RENAME TO "pricehistory_partitioned";
+        ALTER INDEX IF EXISTS "idx_pricehistory_link_date" RENAME TO "idx_pricehistory_partitioned_link_date";
+        CREATE TABLE "pricehistory" (
+    "id" INT NOT NULL PRIMARY KEY DEFAULT nextval('pricehistory_id_seq'),
+    "price" INT,
+    "views" INT,
+    "date" TIMESTAMPTZ NOT NULL,
+    "valid_to" TIMESTAMPTZ,
+    "checks" INT NOT NULL DEFAULT 1,
+    "product_link_id" INT NOT NULL REFERENCES "productlink" ("id") ON DELETE CASCADE
+);
+        ALTER SEQUENCE "pricehistory_id_seq" OWNED BY "pricehistory"."id";
+        INSERT INTO "pricehistory" SELECT "id", "price", "views", "date", "valid_to", "checks", "product_link_id"
+            FROM "pricehistory_partitioned";
+        DROP TABLE "pricehistory_partitioned";
+        CREATE INDEX "idx_pricehistory_link_date" ON "pricehistory" ("product_link_id", "date" DESC);"""
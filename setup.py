@@ -16,6 +16,8 @@ if __name__ == "__main__":
             "bot.database.models.price_history",
             "bot.database.models.product_link",
             "bot.database.models.site",
+            "bot.database.models.page_cache",
+            "bot.database.models.price_history_rollup",
         ]
     }
     run_async(init_tortoise(db_config, modules))
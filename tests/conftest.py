@@ -0,0 +1,12 @@
+import os
+
+# Модули бота читают конфигурацию при импорте; для тестов без базы и Telegram хватает заглушек
+for name, value in {
+    "BOT_TOKEN": "1:test",
+    "ADMINS": "1",
+    "DB_HOST": "localhost",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+}.items():
+    os.environ.setdefault(name, value)
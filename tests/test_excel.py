@@ -0,0 +1,63 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from openpyxl import load_workbook
+
+from bot.services.link import TableHandler
+from bot.tasks.reports import report_queue
+from bot.utils.excel import write_report
+
+REPORTS = 8
+ROWS = 300
+
+
+def make_rows(report: int) -> list[dict]:
+    """Строки отчёта с номером отчёта в каждой ячейке, чтобы чужие данные было видно сразу."""
+    return [{
+        "Название продукта": f"Отчёт {report} товар {i}",
+        "Название компании": f"Компания {report}",
+        "Ссылка на товар": f"https://satu.kz/r{report}/p{i}",
+        "Стоимость": report * 1000 + i,
+    } for i in range(ROWS)]
+
+
+def read_rows(data: bytes) -> tuple[tuple, list[tuple]]:
+    sheet = load_workbook(io.BytesIO(data), read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    return rows[0], rows[1:]
+
+
+def assert_report(report: int, data: bytes) -> None:
+    expected = make_rows(report)
+    header, rows = read_rows(data)
+    assert header == tuple(expected[0])
+    assert rows == [tuple(row.values()) for row in expected]
+
+
+def test_write_report_concurrent():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outputs = list(executor.map(write_report, [make_rows(report) for report in range(REPORTS)]))
+
+    for report, output in enumerate(outputs):
+        assert_report(report, output.getvalue())
+
+
+def test_create_excel_with_autofit_concurrent():
+    groups = [SimpleNamespace(title=f"Группа {report}") for report in range(REPORTS)]
+
+    async def build():
+        try:
+            return await asyncio.gather(*(
+                TableHandler.create_excel_with_autofit(make_rows(report), groups[report])
+                for report in range(REPORTS)
+            ))
+        finally:
+            await report_queue.close()
+
+    files = asyncio.run(build())
+
+    for report, file in enumerate(files):
+        assert file.filename == f"{groups[report].title}.xlsx"
+        assert_report(report, file.data)